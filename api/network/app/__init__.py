@@ -1,14 +1,27 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from .config import Config
+from .utils.json_provider import ORJSONProvider
+from .utils.write_behind import WriteBehindQueue
 
 db = SQLAlchemy()
+write_behind = WriteBehindQueue()
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores FOREIGN KEY constraints unless asked per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
 
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     app.config.from_object(Config)
     
     db.init_app(app)
+    if app.config['WRITE_BEHIND']:
+        write_behind.init_app(app)
     
     # Register blueprints
     from .api.network_api import network_bp
@@ -16,6 +29,8 @@ def create_app():
     
     # Create tables
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _enable_sqlite_foreign_keys)
         db.create_all()
     
     return app
\ No newline at end of file
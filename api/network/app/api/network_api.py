@@ -1,11 +1,267 @@
-from flask import Blueprint, request, jsonify
-from .. import db
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from .. import db, write_behind
 from ..models import Tenant, Network, Subnet, SecurityGroup, SecurityRule
+from ..models.types import uuid7
 from ..utils.ipam import IPAddressManager
+from ..utils.cache import tenant_cache, network_cache, security_group_cache
+from typing import Optional
+from datetime import datetime
+import functools
+import orjson
+import re
 import uuid
 
 network_bp = Blueprint('network', __name__)
 
+def _canonical_id(object_id) -> Optional[str]:
+    """Canonical spelling of a UUID (None if malformed), as stored and used for cache keys"""
+    try:
+        return str(uuid.UUID(object_id))
+    except ValueError:
+        return None
+
+def _get(model, object_id):
+    """Load a row by primary key, treating malformed IDs as missing"""
+    object_id = _canonical_id(object_id)
+    if object_id is None:
+        return None
+    return db.session.get(model, object_id)
+
+def _tenant_exists(tenant_id) -> bool:
+    """Check that a tenant exists, consulting the lookup cache first"""
+    key = _canonical_id(tenant_id)
+    if key is None:
+        return False
+    if tenant_cache.get(key):
+        return True
+    if _get(Tenant, key) is None:
+        return False
+    tenant_cache.set(key, True)
+    return True
+
+def _network_cidr(network_id) -> Optional[str]:
+    """Return a network's CIDR (None if missing), consulting the lookup cache first"""
+    key = _canonical_id(network_id)
+    if key is None:
+        return None
+    cidr = network_cache.get(key)
+    if cidr is None:
+        network = _get(Network, key)
+        if network is None:
+            return None
+        cidr = network.cidr
+        network_cache.set(key, cidr)
+    return cidr
+
+def _security_group_exists(group_id) -> bool:
+    """Check that a security group exists, consulting the lookup cache first"""
+    key = _canonical_id(group_id)
+    if key is None:
+        return False
+    if security_group_cache.get(key):
+        return True
+    if _get(SecurityGroup, key) is None:
+        return False
+    security_group_cache.set(key, True)
+    return True
+
+_EXISTS_CHECKS = {
+    Tenant: _tenant_exists,
+    Network: lambda network_id: _network_cidr(network_id) is not None,
+    SecurityGroup: _security_group_exists,
+}
+
+def _entity_name(model) -> str:
+    """Snake-case model name, e.g. SecurityGroup -> security_group"""
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', model.__name__).lower()
+
+def _not_found(model):
+    label = _entity_name(model).replace('_', ' ').capitalize()
+    return jsonify({'error': f'{label} not found'}), 404
+
+def with_entity(param, model):
+    """Resolve the ``param`` URL argument to a ``model`` row or return a JSON 404
+    
+    The row is passed to the view as a keyword argument named after the model
+    (``tenant``, ``network``, ...).
+    """
+    name = _entity_name(model)
+    
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            obj = _get(model, kwargs[param])
+            if obj is None:
+                return _not_found(model)
+            kwargs[name] = obj
+            return view(**kwargs)
+        return wrapper
+    return decorator
+
+def require_entity(param, model):
+    """Return a JSON 404 unless the ``param`` URL argument names an existing ``model``
+    
+    For views that only need the parent to exist; goes through the lookup cache
+    instead of loading the row.
+    """
+    exists = _EXISTS_CHECKS[model]
+    
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if not exists(kwargs[param]):
+                return _not_found(model)
+            return view(**kwargs)
+        return wrapper
+    return decorator
+
+def _write_behind_requested() -> bool:
+    """Use the write-behind queue unless disabled or the client asks for a sync commit"""
+    return (current_app.config['WRITE_BEHIND']
+            and request.headers.get('X-Write-Mode', '').lower() != 'sync')
+
+def _queue_insert(model, values, cached=None, **counts):
+    """Queue an INSERT for background commit and return the provisional (transient) row
+    
+    ``cached`` is recorded in the model's lookup cache so children can be created
+    right away; the entry is dropped again if the queued insert fails.
+    """
+    now = datetime.utcnow()
+    values = {'id': uuid7(), 'created_at': now, **values}
+    if 'updated_at' in model.__table__.c:
+        values['updated_at'] = now
+    
+    on_failure = None
+    if cached is not None:
+        # Set before submitting so a quick failure can't be overwritten
+        cache = _PARENT_CACHES[model]
+        cache.set(values['id'], cached)
+        on_failure = functools.partial(cache.invalidate, values['id'])
+    
+    write_behind.submit(model, values, on_failure)
+    return model(**values, **counts)
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+_PARENT_CACHES = {
+    Tenant: tenant_cache,
+    Network: network_cache,
+    SecurityGroup: security_group_cache,
+}
+
+class _ParentMissing(Exception):
+    """An insert hit a foreign-key violation because its parent row is gone"""
+    
+    def __init__(self, model):
+        super().__init__(model.__name__)
+        self.model = model
+
+@network_bp.errorhandler(_ParentMissing)
+def _parent_missing(e):
+    return _not_found(e.model)
+
+def _check_parent(parent):
+    """After a failed insert, raise _ParentMissing if the ``(model, id)`` parent no longer exists
+    
+    Also drops the parent's lookup cache entry, which is what let the insert through.
+    """
+    if parent is not None and _get(*parent) is None:
+        model, object_id = parent
+        _PARENT_CACHES[model].invalidate(_canonical_id(object_id))
+        raise _ParentMissing(model)
+
+def _insert_unless_exists(model, values, index_elements, parent=None):
+    """INSERT a row and return it, or None if it collides on the ``index_elements`` unique key
+    
+    Uses a single ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` where the backend
+    supports it, so the uniqueness check and the insert are one atomic round-trip.
+    A deleted ``(model, id)`` parent surfaces as a 404 rather than a conflict.
+    """
+    insert = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    try:
+        if insert is not None:
+            return db.session.execute(
+                insert(model).values(**values)
+                .on_conflict_do_nothing(index_elements=index_elements)
+                .returning(model)
+            ).scalar_one_or_none()
+        
+        return db.session.execute(
+            db.insert(model).values(**values).returning(model)
+        ).scalar_one()
+    except IntegrityError:
+        db.session.rollback()
+        _check_parent(parent)
+        if insert is not None:
+            # ON CONFLICT already covers the unique key, so this is something else
+            raise
+        return None
+
+def _insert(model, values, parent):
+    """INSERT a row and return it; a deleted ``(model, id)`` parent surfaces as a 404"""
+    try:
+        return db.session.execute(
+            db.insert(model).values(**values).returning(model)
+        ).scalar_one()
+    except IntegrityError:
+        db.session.rollback()
+        _check_parent(parent)
+        raise
+
+DEFAULT_DNS_SERVERS = ['8.8.8.8', '8.8.4.4']
+
+def _valid_dns_servers(value) -> bool:
+    """JSON columns store anything; only accept a list of strings"""
+    return isinstance(value, list) and all(isinstance(server, str) for server in value)
+
+def _json_body(body: bytes):
+    """Wrap pre-encoded JSON bytes in a response"""
+    return current_app.response_class(body, mimetype='application/json')
+
+@functools.lru_cache(maxsize=1024)
+def _network_info_body(cidr: str) -> Optional[bytes]:
+    """Encoded calculate_network_info() result, None for an invalid CIDR"""
+    info = IPAddressManager.calculate_network_info(cidr)
+    return orjson.dumps(info) if info else None
+
+# Larger (or negative, i.e. "all but the last n") counts are encoded uncached, so
+# a client can't pin big bodies in the cache; bounds it to about 3 MB
+_MAX_CACHED_SUBNET_COUNT = 64
+
+@functools.lru_cache(maxsize=1024)
+def _subnets_body(parent_cidr: str, new_prefix: int, count: int) -> bytes:
+    """Encoded generate_subnets() result; errors raise and are not cached"""
+    subnets = IPAddressManager.generate_subnets(parent_cidr, new_prefix, count)
+    return orjson.dumps({'subnets': subnets})
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _ndjson(rows):
+    for row in rows:
+        yield orjson.dumps(row.to_dto()) + b'\n'
+
+def _stream_page(query, model):
+    """Stream one page of ``query`` as NDJSON, one object per line
+    
+    Pages are keyed on the time-ordered primary key: ``?limit=`` sets the page
+    size and ``?after=`` takes the ``id`` on the last line of the previous page.
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after = request.args.get('after')
+    if after is not None:
+        try:
+            uuid.UUID(after)
+        except ValueError:
+            return jsonify({'error': 'Invalid pagination cursor'}), 400
+        query = query.filter(model.id > after)
+    
+    rows = query.order_by(model.id).limit(limit).yield_per(500)
+    return current_app.response_class(stream_with_context(_ndjson(rows)),
+                                      mimetype='application/x-ndjson')
+
 # Tenant Management
 @network_bp.route('/tenants', methods=['POST'])
 def create_tenant():
@@ -15,56 +271,55 @@ def create_tenant():
     if not data or 'name' not in data:
         return jsonify({'error': 'Tenant name is required'}), 400
     
-    # Check if tenant already exists
-    existing = Tenant.query.filter_by(name=data['name']).first()
-    if existing:
-        return jsonify({'error': 'Tenant with this name already exists'}), 409
-    
-    tenant = Tenant(
+    values = dict(
         name=data['name'],
         description=data.get('description', '')
     )
     
-    db.session.add(tenant)
+    if _write_behind_requested():
+        tenant = _queue_insert(Tenant, values, cached=True, network_count=0)
+        return jsonify(tenant.to_dto()), 202
+    
+    tenant = _insert_unless_exists(Tenant, values, ['name'])
+    if tenant is None:
+        return jsonify({'error': 'Tenant with this name already exists'}), 409
+    
+    # Serialize before commit so the response doesn't re-SELECT expired attributes
+    body = tenant.to_dto()
     db.session.commit()
     
-    return jsonify(tenant.to_dict()), 201
+    return jsonify(body), 201
 
 @network_bp.route('/tenants', methods=['GET'])
 def list_tenants():
     """List all tenants"""
-    tenants = Tenant.query.all()
-    return jsonify([tenant.to_dict() for tenant in tenants])
+    return _stream_page(Tenant.query, Tenant)
 
 @network_bp.route('/tenants/<tenant_id>', methods=['GET'])
-def get_tenant(tenant_id):
+@with_entity('tenant_id', Tenant)
+def get_tenant(tenant_id, tenant):
     """Get tenant details"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return jsonify({'error': 'Tenant not found'}), 404
-    
-    return jsonify(tenant.to_dict())
+    return jsonify(tenant.to_dto())
 
 @network_bp.route('/tenants/<tenant_id>', methods=['DELETE'])
-def delete_tenant(tenant_id):
+@with_entity('tenant_id', Tenant)
+def delete_tenant(tenant_id, tenant):
     """Delete a tenant"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return jsonify({'error': 'Tenant not found'}), 404
-    
     db.session.delete(tenant)
     db.session.commit()
     
+    # Child networks and groups are cascade-deleted; drop their cached lookups too
+    tenant_cache.invalidate(tenant.id)
+    network_cache.clear()
+    security_group_cache.clear()
+    
     return jsonify({'message': 'Tenant deleted successfully'}), 200
 
 # Network Management
 @network_bp.route('/tenants/<tenant_id>/networks', methods=['POST'])
+@require_entity('tenant_id', Tenant)
 def create_network(tenant_id):
     """Create a network for a tenant"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return jsonify({'error': 'Tenant not found'}), 404
-    
     data = request.get_json()
     
     if not data or 'name' not in data or 'cidr' not in data:
@@ -74,64 +329,58 @@ def create_network(tenant_id):
     if not IPAddressManager.validate_cidr(data['cidr']):
         return jsonify({'error': 'Invalid CIDR notation'}), 400
     
-    # Check if network name already exists for this tenant
-    existing = Network.query.filter_by(tenant_id=tenant_id, name=data['name']).first()
-    if existing:
-        return jsonify({'error': 'Network with this name already exists for this tenant'}), 409
+    if not _valid_dns_servers(data.get('dns_servers', DEFAULT_DNS_SERVERS)):
+        return jsonify({'error': 'dns_servers must be a list of strings'}), 400
     
-    network = Network(
+    values = dict(
         name=data['name'],
         tenant_id=tenant_id,
         cidr=data['cidr'],
         gateway_ip=data.get('gateway_ip'),
-        dns_servers=','.join(data.get('dns_servers', ['8.8.8.8', '8.8.4.4'])),
+        dns_servers=data.get('dns_servers', DEFAULT_DNS_SERVERS),
         status=data.get('status', 'active')
     )
     
-    db.session.add(network)
+    if _write_behind_requested():
+        network = _queue_insert(Network, values, cached=values['cidr'], subnet_count=0)
+        return jsonify(network.to_dto()), 202
+    
+    network = _insert_unless_exists(Network, values, ['tenant_id', 'name'], (Tenant, tenant_id))
+    if network is None:
+        return jsonify({'error': 'Network with this name already exists for this tenant'}), 409
+    
+    body = network.to_dto()
     db.session.commit()
     
-    return jsonify(network.to_dict()), 201
+    return jsonify(body), 201
 
 @network_bp.route('/tenants/<tenant_id>/networks', methods=['GET'])
+@require_entity('tenant_id', Tenant)
 def list_networks(tenant_id):
     """List all networks for a tenant"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return jsonify({'error': 'Tenant not found'}), 404
-    
-    networks = Network.query.filter_by(tenant_id=tenant_id).all()
-    return jsonify([network.to_dict() for network in networks])
+    return _stream_page(Network.query.filter_by(tenant_id=tenant_id), Network)
 
 @network_bp.route('/networks/<network_id>', methods=['GET'])
-def get_network(network_id):
+@with_entity('network_id', Network)
+def get_network(network_id, network):
     """Get network details"""
-    network = Network.query.get(network_id)
-    if not network:
-        return jsonify({'error': 'Network not found'}), 404
-    
-    return jsonify(network.to_dict())
+    return jsonify(network.to_dto())
 
 @network_bp.route('/networks/<network_id>', methods=['DELETE'])
-def delete_network(network_id):
+@with_entity('network_id', Network)
+def delete_network(network_id, network):
     """Delete a network"""
-    network = Network.query.get(network_id)
-    if not network:
-        return jsonify({'error': 'Network not found'}), 404
-    
     db.session.delete(network)
     db.session.commit()
+    network_cache.invalidate(network.id)
     
     return jsonify({'message': 'Network deleted successfully'}), 200
 
 # Subnet Management
 @network_bp.route('/networks/<network_id>/subnets', methods=['POST'])
+@require_entity('network_id', Network)
 def create_subnet(network_id):
     """Create a subnet within a network"""
-    network = Network.query.get(network_id)
-    if not network:
-        return jsonify({'error': 'Network not found'}), 404
-    
     data = request.get_json()
     
     if not data or 'name' not in data or 'cidr' not in data:
@@ -141,16 +390,14 @@ def create_subnet(network_id):
     if not IPAddressManager.validate_cidr(data['cidr']):
         return jsonify({'error': 'Invalid CIDR notation'}), 400
     
-    # Check if subnet is within network
-    if not IPAddressManager.is_subnet_of(network.cidr, data['cidr']):
+    # Check if subnet is within network (CIDR is cached by require_entity)
+    if not IPAddressManager.is_subnet_of(_network_cidr(network_id), data['cidr']):
         return jsonify({'error': 'Subnet must be within the parent network CIDR'}), 400
     
-    # Check if subnet name already exists in this network
-    existing = Subnet.query.filter_by(network_id=network_id, name=data['name']).first()
-    if existing:
-        return jsonify({'error': 'Subnet with this name already exists in this network'}), 409
+    if not _valid_dns_servers(data.get('dns_servers', DEFAULT_DNS_SERVERS)):
+        return jsonify({'error': 'dns_servers must be a list of strings'}), 400
     
-    subnet = Subnet(
+    values = dict(
         name=data['name'],
         network_id=network_id,
         cidr=data['cidr'],
@@ -158,71 +405,71 @@ def create_subnet(network_id):
         end_ip=data.get('end_ip'),
         gateway_ip=data.get('gateway_ip'),
         dhcp_enabled=data.get('dhcp_enabled', True),
-        dns_servers=','.join(data.get('dns_servers', ['8.8.8.8', '8.8.4.4'])),
+        dns_servers=data.get('dns_servers', DEFAULT_DNS_SERVERS),
         status=data.get('status', 'active')
     )
     
-    db.session.add(subnet)
+    if _write_behind_requested():
+        return jsonify(_queue_insert(Subnet, values).to_dto()), 202
+    
+    subnet = _insert_unless_exists(Subnet, values, ['network_id', 'name'], (Network, network_id))
+    if subnet is None:
+        return jsonify({'error': 'Subnet with this name already exists in this network'}), 409
+    
+    body = subnet.to_dto()
     db.session.commit()
     
-    return jsonify(subnet.to_dict()), 201
+    return jsonify(body), 201
 
 @network_bp.route('/networks/<network_id>/subnets', methods=['GET'])
+@require_entity('network_id', Network)
 def list_subnets(network_id):
     """List all subnets in a network"""
-    network = Network.query.get(network_id)
-    if not network:
-        return jsonify({'error': 'Network not found'}), 404
-    
-    subnets = Subnet.query.filter_by(network_id=network_id).all()
-    return jsonify([subnet.to_dict() for subnet in subnets])
+    return _stream_page(Subnet.query.filter_by(network_id=network_id), Subnet)
 
 @network_bp.route('/subnets/<subnet_id>', methods=['GET'])
-def get_subnet(subnet_id):
+@with_entity('subnet_id', Subnet)
+def get_subnet(subnet_id, subnet):
     """Get subnet details"""
-    subnet = Subnet.query.get(subnet_id)
-    if not subnet:
-        return jsonify({'error': 'Subnet not found'}), 404
-    
-    return jsonify(subnet.to_dict())
+    return jsonify(subnet.to_dto())
 
 # Security Group Management
 @network_bp.route('/tenants/<tenant_id>/security-groups', methods=['POST'])
+@require_entity('tenant_id', Tenant)
 def create_security_group(tenant_id):
     """Create a security group"""
-    tenant = Tenant.query.get(tenant_id)
-    if not tenant:
-        return jsonify({'error': 'Tenant not found'}), 404
-    
     data = request.get_json()
     
     if not data or 'name' not in data:
         return jsonify({'error': 'Security group name is required'}), 400
     
-    security_group = SecurityGroup(
+    values = dict(
         name=data['name'],
         tenant_id=tenant_id,
         description=data.get('description', '')
     )
     
-    db.session.add(security_group)
+    if _write_behind_requested():
+        security_group = _queue_insert(SecurityGroup, values, cached=True, rule_count=0)
+        return jsonify(security_group.to_dto()), 202
+    
+    security_group = _insert(SecurityGroup, values, (Tenant, tenant_id))
+    
+    body = security_group.to_dto()
     db.session.commit()
     
-    return jsonify(security_group.to_dict()), 201
+    return jsonify(body), 201
 
 @network_bp.route('/security-groups/<group_id>/rules', methods=['POST'])
+@require_entity('group_id', SecurityGroup)
 def add_security_rule(group_id):
     """Add a rule to security group"""
-    security_group = SecurityGroup.query.get(group_id)
-    if not security_group:
-        return jsonify({'error': 'Security group not found'}), 404
-    
     data = request.get_json()
     
     if not data or 'direction' not in data or 'protocol' not in data:
         return jsonify({'error': 'Direction and protocol are required'}), 400
     
-    rule = SecurityRule(
+    values = dict(
         security_group_id=group_id,
         direction=data['direction'],
         protocol=data['protocol'],
@@ -232,20 +479,25 @@ def add_security_rule(group_id):
         description=data.get('description', '')
     )
     
-    db.session.add(rule)
+    if _write_behind_requested():
+        return jsonify(_queue_insert(SecurityRule, values).to_dto()), 202
+    
+    rule = _insert(SecurityRule, values, (SecurityGroup, group_id))
+    
+    body = rule.to_dto()
     db.session.commit()
     
-    return jsonify(rule.to_dict()), 201
+    return jsonify(body), 201
 
 # Utility endpoints
 @network_bp.route('/utils/calculate-network/<cidr>', methods=['GET'])
 def calculate_network(cidr):
     """Calculate network information"""
-    info = IPAddressManager.calculate_network_info(cidr)
-    if not info:
+    body = _network_info_body(cidr)
+    if body is None:
         return jsonify({'error': 'Invalid CIDR notation'}), 400
     
-    return jsonify(info)
+    return _json_body(body)
 
 @network_bp.route('/utils/generate-subnets', methods=['POST'])
 def generate_subnets():
@@ -255,13 +507,14 @@ def generate_subnets():
     if not data or 'parent_cidr' not in data or 'new_prefix' not in data:
         return jsonify({'error': 'parent_cidr and new_prefix are required'}), 400
     
+    parent_cidr = data['parent_cidr']
     try:
-        subnets = IPAddressManager.generate_subnets(
-            data['parent_cidr'],
-            int(data['new_prefix']),
-            int(data.get('count', 5))
-        )
-        return jsonify({'subnets': subnets})
+        new_prefix = int(data['new_prefix'])
+        count = int(data.get('count', 5))
+        # Unhashable payloads can't be cache keys; let the uncached call reject them
+        cacheable = isinstance(parent_cidr, str) and 0 <= count <= _MAX_CACHED_SUBNET_COUNT
+        generate = _subnets_body if cacheable else _subnets_body.__wrapped__
+        return _json_body(generate(parent_cidr, new_prefix, count))
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
 
@@ -6,4 +6,23 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///network_manager.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        # Keep compiled statements around across requests
+        'query_cache_size': 1200,
+    }
+    
+    # Commit create requests on a background thread and answer 202 immediately.
+    # Name conflicts then surface in the log rather than as a 409; clients can
+    # still force a synchronous commit per request with "X-Write-Mode: sync".
+    WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'false').lower() == 'true'
+    
+    # SQLite uses a static/singleton pool, so sizing only applies to server databases
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '20')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '40')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '5')),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            'pool_pre_ping': True,
+        })
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+# Response schemas. orjson encodes dataclass instances natively, so views hand
+# these straight to jsonify without building an intermediate dict.
+
+@dataclass(slots=True)
+class TenantDTO:
+    id: str
+    name: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    network_count: int
+
+@dataclass(slots=True)
+class NetworkDTO:
+    id: str
+    name: str
+    tenant_id: str
+    cidr: str
+    gateway_ip: Optional[str]
+    dns_servers: List[str]
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    subnet_count: int
+
+@dataclass(slots=True)
+class SubnetDTO:
+    id: str
+    name: str
+    network_id: str
+    cidr: str
+    start_ip: Optional[str]
+    end_ip: Optional[str]
+    gateway_ip: Optional[str]
+    dhcp_enabled: bool
+    dns_servers: List[str]
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+@dataclass(slots=True)
+class SecurityGroupDTO:
+    id: str
+    name: str
+    tenant_id: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    rule_count: int
+
+@dataclass(slots=True)
+class SecurityRuleDTO:
+    id: str
+    security_group_id: str
+    direction: str
+    protocol: str
+    port_range: str
+    remote_ip_prefix: Optional[str]
+    description: Optional[str]
+    created_at: datetime
@@ -1,17 +1,22 @@
 from .. import db
-import uuid
+from .types import BinaryUUID, uuid7
+from .dto import NetworkDTO, SubnetDTO
 from datetime import datetime
 import ipaddress
 
 class Network(db.Model):
     __tablename__ = 'networks'
+    __table_args__ = (
+        # Also serves tenant_id lookups (leading column)
+        db.UniqueConstraint('tenant_id', 'name', name='uq_networks_tenant_name'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(BinaryUUID, primary_key=True, default=uuid7)
     name = db.Column(db.String(100), nullable=False)
-    tenant_id = db.Column(db.String(36), db.ForeignKey('tenants.id'), nullable=False)
+    tenant_id = db.Column(BinaryUUID, db.ForeignKey('tenants.id'), nullable=False)
     cidr = db.Column(db.String(18), nullable=False)  # e.g., "10.0.0.0/16"
     gateway_ip = db.Column(db.String(15))
-    dns_servers = db.Column(db.String(200))  # Comma-separated DNS servers
+    dns_servers = db.Column(db.JSON, default=list)  # List of DNS server IPs
     status = db.Column(db.String(20), default='active')  # active, inactive, pending
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -19,19 +24,19 @@ class Network(db.Model):
     # Relationships
     subnets = db.relationship('Subnet', backref='network', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'tenant_id': self.tenant_id,
-            'cidr': self.cidr,
-            'gateway_ip': self.gateway_ip,
-            'dns_servers': self.dns_servers.split(',') if self.dns_servers else [],
-            'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'subnet_count': len(self.subnets)
-        }
+    def to_dto(self) -> NetworkDTO:
+        return NetworkDTO(
+            id=self.id,
+            name=self.name,
+            tenant_id=self.tenant_id,
+            cidr=self.cidr,
+            gateway_ip=self.gateway_ip,
+            dns_servers=self.dns_servers or [],
+            status=self.status,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            subnet_count=self.subnet_count
+        )
     
     def validate_cidr(self):
         """Validate the CIDR notation"""
@@ -43,32 +48,44 @@ class Network(db.Model):
 
 class Subnet(db.Model):
     __tablename__ = 'subnets'
+    __table_args__ = (
+        # Also serves network_id lookups (leading column)
+        db.UniqueConstraint('network_id', 'name', name='uq_subnets_network_name'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(BinaryUUID, primary_key=True, default=uuid7)
     name = db.Column(db.String(100), nullable=False)
-    network_id = db.Column(db.String(36), db.ForeignKey('networks.id'), nullable=False)
+    network_id = db.Column(BinaryUUID, db.ForeignKey('networks.id'), nullable=False)
     cidr = db.Column(db.String(18), nullable=False)  # e.g., "10.0.1.0/24"
     start_ip = db.Column(db.String(15))
     end_ip = db.Column(db.String(15))
     gateway_ip = db.Column(db.String(15))
     dhcp_enabled = db.Column(db.Boolean, default=True)
-    dns_servers = db.Column(db.String(200))
+    dns_servers = db.Column(db.JSON, default=list)
     status = db.Column(db.String(20), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'network_id': self.network_id,
-            'cidr': self.cidr,
-            'start_ip': self.start_ip,
-            'end_ip': self.end_ip,
-            'gateway_ip': self.gateway_ip,
-            'dhcp_enabled': self.dhcp_enabled,
-            'dns_servers': self.dns_servers.split(',') if self.dns_servers else [],
-            'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+    def to_dto(self) -> SubnetDTO:
+        return SubnetDTO(
+            id=self.id,
+            name=self.name,
+            network_id=self.network_id,
+            cidr=self.cidr,
+            start_ip=self.start_ip,
+            end_ip=self.end_ip,
+            gateway_ip=self.gateway_ip,
+            dhcp_enabled=self.dhcp_enabled,
+            dns_servers=self.dns_servers or [],
+            status=self.status,
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+# Count subnets in the parent SELECT instead of lazy-loading the collection
+Network.subnet_count = db.column_property(
+    db.select(db.func.count(Subnet.id))
+    .where(Subnet.network_id == Network.id)
+    .correlate_except(Subnet)
+    .scalar_subquery()
+)
@@ -1,11 +1,13 @@
 from .. import db
-import uuid
+from .network import Network
+from .types import BinaryUUID, uuid7
+from .dto import TenantDTO
 from datetime import datetime
 
 class Tenant(db.Model):
     __tablename__ = 'tenants'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(BinaryUUID, primary_key=True, default=uuid7)
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -14,12 +16,20 @@ class Tenant(db.Model):
     # Relationships
     networks = db.relationship('Network', backref='tenant', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'network_count': len(self.networks)
-        }
\ No newline at end of file
+    # Count networks in the tenant SELECT instead of lazy-loading the collection
+    network_count = db.column_property(
+        db.select(db.func.count(Network.id))
+        .where(Network.tenant_id == id)
+        .correlate_except(Network)
+        .scalar_subquery()
+    )
+    
+    def to_dto(self) -> TenantDTO:
+        return TenantDTO(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            network_count=self.network_count
+        )
\ No newline at end of file
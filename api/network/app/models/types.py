@@ -0,0 +1,47 @@
+import os
+import time
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+from .. import db
+
+
+def uuid7() -> str:
+    """Generate a time-ordered UUIDv7 (RFC 9562) string
+    
+    The leading 48 bits are a millisecond Unix timestamp, so new keys land at
+    the right-hand edge of the primary-key B-tree instead of splitting random
+    pages the way UUIDv4 does.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    # Set version (7) and RFC 4122 variant bits
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return str(uuid.UUID(int=value))
+
+
+class BinaryUUID(db.TypeDecorator):
+    """UUID stored as 16 raw bytes (native UUID on PostgreSQL), exposed as a str"""
+    
+    impl = db.BINARY(16)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(db.BINARY(16))
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            return str(uuid.UUID(str(value)))
+        return uuid.UUID(str(value)).bytes
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'postgresql':
+            return str(value)
+        return str(uuid.UUID(bytes=value))
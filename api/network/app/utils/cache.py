@@ -0,0 +1,37 @@
+import threading
+from cachetools import TTLCache
+
+
+class LookupCache:
+    """Thread-safe in-process TTL cache for hot parent-ID lookups
+    
+    Only plain values are stored (never ORM instances), so entries are safe to
+    share across requests and sessions. Entries expire after ``ttl`` seconds,
+    which bounds staleness across worker processes.
+    """
+    
+    def __init__(self, maxsize: int = 10_000, ttl: int = 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            return self._cache.get(key, default)
+    
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# tenant_id -> True, network_id -> cidr, security_group_id -> True
+tenant_cache = LookupCache()
+network_cache = LookupCache()
+security_group_cache = LookupCache()
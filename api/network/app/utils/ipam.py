@@ -1,6 +1,31 @@
+import functools
 import ipaddress
+import itertools
 from typing import List, Optional, Tuple
 
+
+@functools.lru_cache(maxsize=4096)
+def _parse_cidr(cidr: str):
+    return ipaddress.ip_network(cidr)
+
+def _parse(cidr):
+    """Parse a network, reusing the cached object for repeated CIDR strings"""
+    if isinstance(cidr, str):
+        return _parse_cidr(cidr)
+    # Unhashable request payloads (lists, dicts) must still raise ValueError
+    return ipaddress.ip_network(cidr)
+
+def _host_bounds(network) -> Tuple[int, int]:
+    """Return the first and last usable host as integers, matching ``hosts()``"""
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    # /31, /32 (and /127, /128) have no reserved addresses
+    if network.num_addresses > 2:
+        first += 1
+        if network.version == 4:
+            last -= 1
+    return first, last
+
 class IPAddressManager:
     """IP Address Management utility"""
     
@@ -8,7 +33,7 @@ class IPAddressManager:
     def validate_cidr(cidr: str) -> bool:
         """Validate CIDR notation"""
         try:
-            ipaddress.ip_network(cidr)
+            _parse(cidr)
             return True
         except ValueError:
             return False
@@ -17,9 +42,12 @@ class IPAddressManager:
     def is_subnet_of(parent_cidr: str, subnet_cidr: str) -> bool:
         """Check if subnet is within parent network"""
         try:
-            parent_net = ipaddress.ip_network(parent_cidr)
-            subnet_net = ipaddress.ip_network(subnet_cidr)
-            return subnet_net.subnet_of(parent_net)
+            parent_net = _parse(parent_cidr)
+            subnet_net = _parse(subnet_cidr)
+            # Same containment test as subnet_of(), without building supernets
+            return (subnet_net.version == parent_net.version
+                    and subnet_net.prefixlen >= parent_net.prefixlen
+                    and int(subnet_net.network_address) & int(parent_net.netmask) == int(parent_net.network_address))
         except ValueError:
             return False
     
@@ -27,9 +55,14 @@ class IPAddressManager:
     def generate_subnets(parent_cidr: str, new_prefix: int, count: int) -> List[str]:
         """Generate subnets from a parent network"""
         try:
-            parent_net = ipaddress.ip_network(parent_cidr)
-            subnets = list(parent_net.subnets(new_prefix=new_prefix))
-            return [str(subnet) for subnet in subnets[:count]]
+            parent_net = _parse(parent_cidr)
+            subnets = parent_net.subnets(new_prefix=new_prefix)
+            # Only build the subnets we return, not e.g. all 65536 /24s of a /8
+            if count >= 0:
+                subnets = itertools.islice(subnets, count)
+            else:
+                subnets = list(subnets)[:count]
+            return [str(subnet) for subnet in subnets]
         except ValueError as e:
             raise ValueError(f"Error generating subnets: {str(e)}")
     
@@ -37,14 +70,27 @@ class IPAddressManager:
     def get_available_ip(subnet_cidr: str, used_ips: List[str]) -> Optional[str]:
         """Get an available IP address from subnet"""
         try:
-            subnet = ipaddress.ip_network(subnet_cidr)
-            used_set = {ipaddress.ip_address(ip) for ip in used_ips}
-            
+            subnet = _parse(subnet_cidr)
             # Skip network and broadcast addresses
-            for host in subnet.hosts():
-                if host not in used_set:
-                    return str(host)
-            return None
+            first, last = _host_bounds(subnet)
+            
+            used_set = set()
+            for ip in used_ips:
+                addr = ipaddress.ip_address(ip)
+                if addr.version == subnet.version and first <= int(addr) <= last:
+                    used_set.add(int(addr))
+            
+            # Walk the sorted used addresses to find the first gap, so the cost
+            # depends on how many addresses are taken rather than the subnet size
+            candidate = first
+            for used in sorted(used_set):
+                if used != candidate:
+                    break
+                candidate += 1
+            
+            if candidate > last:
+                return None
+            return str(type(subnet.network_address)(candidate))
         except ValueError:
             return None
     
@@ -52,7 +98,9 @@ class IPAddressManager:
     def calculate_network_info(cidr: str) -> dict:
         """Calculate network information from CIDR"""
         try:
-            network = ipaddress.ip_network(cidr)
+            network = _parse(cidr)
+            address_class = type(network.network_address)
+            first, last = _host_bounds(network)
             return {
                 'network_address': str(network.network_address),
                 'broadcast_address': str(network.broadcast_address),
@@ -61,8 +109,8 @@ class IPAddressManager:
                 'prefixlen': network.prefixlen,
                 'num_addresses': network.num_addresses,
                 'usable_hosts': network.num_addresses - 2 if network.version == 4 else network.num_addresses,
-                'first_usable': str(list(network.hosts())[0]) if list(network.hosts()) else None,
-                'last_usable': str(list(network.hosts())[-1]) if list(network.hosts()) else None
+                'first_usable': str(address_class(first)),
+                'last_usable': str(address_class(last))
             }
         except ValueError:
             return {}
\ No newline at end of file
@@ -0,0 +1,23 @@
+import orjson
+from flask.json.provider import JSONProvider
+
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson
+    
+    Used by ``jsonify`` and ``request.get_json``. orjson encodes straight to
+    bytes and handles ``datetime`` natively, so models can hand back raw
+    column values.
+    """
+    
+    mimetype = 'application/json'
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype=self.mimetype)
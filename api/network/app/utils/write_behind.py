@@ -0,0 +1,109 @@
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+
+
+class WriteBehindQueue:
+    """Commit queued INSERTs in batches on a background thread
+    
+    Create handlers push ``(model, values)`` pairs and return immediately; the
+    worker groups whatever arrives within ``flush_interval`` seconds (up to
+    ``batch_size`` rows) into a single transaction, so one commit/fsync is
+    amortized across many creates. Follows the Flask extension pattern: create
+    at import time, bind with ``init_app``. The worker is started on first
+    ``submit`` in each process, so it also runs in workers forked after the app
+    was created (e.g. gunicorn ``--preload``).
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.01):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._app = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+    
+    def init_app(self, app):
+        self._app = app
+        atexit.register(self.shutdown)
+    
+    def submit(self, model, values: dict, on_failure=None):
+        """Queue an INSERT; ``on_failure()`` is called from the worker if the row can't be written"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._start()
+        self._queue.put((model, values, on_failure))
+    
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Threads don't survive fork; neither should a queue the parent may have locked
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Flush pending rows and stop the worker"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._flush(batch)
+            if stop:
+                return
+    
+    def _flush(self, batch):
+        from .. import db
+        
+        with self._app.app_context():
+            try:
+                # Consecutive rows of the same model share one executemany; order
+                # is preserved so parents are inserted before their children
+                for model, rows in itertools.groupby(batch, key=lambda item: item[0]):
+                    db.session.execute(db.insert(model), [values for _, values, _ in rows])
+                db.session.commit()
+                return
+            except Exception as e:
+                db.session.rollback()
+                self._app.logger.warning(f"Write-behind batch of {len(batch)} failed, retrying per row: {e}")
+            
+            # Isolate the bad rows so they don't take the rest of the batch down
+            for model, values, on_failure in batch:
+                try:
+                    db.session.execute(db.insert(model), [values])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    self._app.logger.error(f"Write-behind insert into {model.__tablename__} failed: {e}")
+                    if on_failure is not None:
+                        on_failure()
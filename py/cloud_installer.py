@@ -8,6 +8,7 @@ import sys
 import argparse
 import logging
 from pathlib import Path
+from types import MappingProxyType
 
 # Add project root to Python path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -25,6 +26,30 @@ from phases import (
 )
 
 
+# Available phases, in run order
+PHASES = MappingProxyType({
+    'preflight': PreflightPhase,
+    'system_prep': SystemPrepPhase,
+    'network': NetworkPhase,
+    'controller': ControllerPhase,
+    'compute': ComputePhase,
+    'post_install': PostInstallPhase,
+    'verification': VerificationPhase,
+})
+
+PHASE_ORDER = tuple(PHASES)
+
+PHASES_INFO = (
+    ('preflight', "Pre-flight checks and validation"),
+    ('system_prep', "System preparation and updates"),
+    ('network', "Network configuration"),
+    ('controller', "Controller components installation"),
+    ('compute', "Compute components installation"),
+    ('post_install', "Post-install configuration"),
+    ('verification', "Verification and testing"),
+)
+
+
 class CloudInstaller:
     """Main installer orchestrator"""
     
@@ -32,17 +57,7 @@ class CloudInstaller:
         self.interactive = interactive
         self.config = NodeConfig()
         self.logger = logging.getLogger(__name__)
-        
-        # Define available phases
-        self.phases = {
-            'preflight': PreflightPhase,
-            'system_prep': SystemPrepPhase,
-            'network': NetworkPhase,
-            'controller': ControllerPhase,
-            'compute': ComputePhase,
-            'post_install': PostInstallPhase,
-            'verification': VerificationPhase,
-        }
+        self.phases = PHASES
         
     def print_banner(self):
         """Print installation banner"""
@@ -55,12 +70,18 @@ class CloudInstaller:
         """
         print(banner)
     
-    def run_interactive(self):
+    def run_interactive(self, config_file=None):
         """Run interactive installation"""
         self.print_banner()
         
-        # Load existing config or collect new
-        if self.config.exists() and self.ask_yes_no(
+        # Load preseed, existing config or collect new
+        if config_file:
+            # An explicit file that fails to load aborts, as in non-interactive mode
+            if not self.config.load_from_file(config_file, PHASE_ORDER):
+                sys.exit(1)
+            print("\nLoaded preseed configuration:")
+            self.config.print_summary()
+        elif self.config.exists() and self.ask_yes_no(
             "Existing configuration found. Load it?", default=True
         ):
             self.config.load()
@@ -76,7 +97,9 @@ class CloudInstaller:
         self.config.save()
         
         # Select phases to run
-        phases_to_run = self.select_phases()
+        phases_to_run = self.config.preseed_phases
+        if phases_to_run is None:
+            phases_to_run = self.select_phases()
         
         # Run selected phases
         self.run_phases(phases_to_run)
@@ -87,15 +110,17 @@ class CloudInstaller:
     def run_non_interactive(self, config_file=None):
         """Run non-interactive installation"""
         if config_file:
-            self.config.load_from_file(config_file)
+            if not self.config.load_from_file(config_file, PHASE_ORDER):
+                sys.exit(1)
         elif self.config.exists():
             self.config.load()
         else:
             self.logger.error("No configuration provided and no existing config found")
             sys.exit(1)
         
-        # Run all phases
-        self.run_phases(list(self.phases.keys()))
+        # Run preseeded phases, or all of them
+        phases = self.config.preseed_phases
+        self.run_phases(PHASE_ORDER if phases is None else phases)
     
     def select_phases(self):
         """Select which phases to run"""
@@ -103,18 +128,8 @@ class CloudInstaller:
         print("PHASE SELECTION")
         print("="*60)
         
-        phases_info = {
-            'preflight': "Pre-flight checks and validation",
-            'system_prep': "System preparation and updates",
-            'network': "Network configuration",
-            'controller': "Controller components installation",
-            'compute': "Compute components installation",
-            'post_install': "Post-install configuration",
-            'verification': "Verification and testing",
-        }
-        
         # Show available phases
-        for i, (phase_id, description) in enumerate(phases_info.items(), 1):
+        for i, (phase_id, description) in enumerate(PHASES_INFO, 1):
             print(f"{i}. {phase_id:15} - {description}")
         
         print("\nOptions:")
@@ -123,27 +138,23 @@ class CloudInstaller:
         print("  skip:X   - Run all phases except X")
         print("  only:X   - Run only phase X")
         
-        choice = input("\nSelect phases to run [all]: ").strip().lower()
-        
-        if not choice or choice == 'all':
-            return list(self.phases.keys())
-        elif choice.startswith('skip:'):
-            skip_phase = choice.split(':', 1)[1]
-            return [p for p in self.phases.keys() if p != skip_phase]
-        elif choice.startswith('only:'):
-            only_phase = choice.split(':', 1)[1]
-            if only_phase in self.phases:
-                return [only_phase]
-            else:
+        while True:
+            choice = input("\nSelect phases to run [all]: ").strip().lower()
+            
+            if not choice or choice == 'all':
+                return list(PHASE_ORDER)
+            elif choice.startswith('skip:'):
+                skip_phase = choice.split(':', 1)[1]
+                return [p for p in PHASE_ORDER if p != skip_phase]
+            elif choice.startswith('only:'):
+                only_phase = choice.split(':', 1)[1]
+                if only_phase in PHASES:
+                    return [only_phase]
                 print(f"Unknown phase: {only_phase}")
-                return self.select_phases()
-        elif choice.isdigit() and 1 <= int(choice) <= len(self.phases):
-            phase_idx = int(choice) - 1
-            phase_id = list(self.phases.keys())[phase_idx]
-            return [phase_id]
-        else:
-            print("Invalid selection")
-            return self.select_phases()
+            elif choice.isdigit() and 1 <= int(choice) <= len(PHASE_ORDER):
+                return [PHASE_ORDER[int(choice) - 1]]
+            else:
+                print("Invalid selection")
     
     def run_phases(self, phase_ids):
         """Run specified phases"""
@@ -208,9 +219,11 @@ class CloudInstaller:
         print("  2. Check status: cloud-status.sh")
         print("  3. Create first tenant: create-tenant.sh 1 172.16.1.0/24")
     
-    @staticmethod
-    def ask_yes_no(question, default=True):
-        """Ask yes/no question"""
+    def ask_yes_no(self, question, default=True):
+        """Ask yes/no question, using the preseeded answer if there is one"""
+        if question in self.config.preseed_answers:
+            return self.config.preseed_answers[question]
+        
         suffix = "[Y/n]" if default else "[y/N]"
         while True:
             response = input(f"{question} {suffix}: ").strip().lower()
@@ -238,7 +251,7 @@ def main():
     parser.add_argument(
         '--config', '-c',
         type=str,
-        help='Configuration file for non-interactive mode'
+        help='Configuration or preseed file (may include "phases" and "answers")'
     )
     
     parser.add_argument(
@@ -287,14 +300,14 @@ def main():
                 phase.run()
             else:
                 print(f"Unknown phase: {args.phase}")
-                print(f"Available phases: {', '.join(installer.phases.keys())}")
+                print(f"Available phases: {', '.join(PHASE_ORDER)}")
                 sys.exit(1)
         elif args.non_interactive:
             # Non-interactive mode
             installer.run_non_interactive(args.config)
         else:
             # Interactive mode
-            installer.run_interactive()
+            installer.run_interactive(args.config)
     except KeyboardInterrupt:
         print("\n\nInstallation cancelled by user")
         sys.exit(0)
@@ -5,14 +5,31 @@ config/node_config.py - Configuration management
 
 import os
 import json
-import yaml
 import socket
-import netifaces
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field, fields
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 import logging
 
+from utils import validators
+
+# orjson is optional; both paths work on bytes
+try:
+    import orjson
+    
+    def _json_dumps(obj) -> bytes:
+        # orjson indents in C, so node.json stays readable at no real cost
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        # indent= would force the stdlib's pure-Python encoder; stay compact
+        return json.dumps(obj, separators=(',', ':')).encode()
+    
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,47 +59,51 @@ class NodeConfig:
     ceph_public_network: str = "10.0.2.0/24"
     ceph_disks: List[str] = field(default_factory=list)
     
-    # Derived properties
-    @property
+    # Derived properties (cached; see __setattr__)
+    @cached_property
     def mgmt_network(self) -> str:
         """Get management network from IP"""
         if self.mgmt_ip:
-            parts = self.mgmt_ip.split('.')
-            return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
+            return self.mgmt_ip.rsplit('.', 1)[0] + '.0/24'
         return "10.0.0.0/24"
     
-    @property
+    @cached_property
     def internal_network(self) -> str:
         """Get internal network from IP"""
         if self.internal_ip:
-            parts = self.internal_ip.split('.')
-            return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
+            return self.internal_ip.rsplit('.', 1)[0] + '.0/24'
         return "10.0.1.0/24"
     
-    @property
+    @cached_property
     def storage_network(self) -> str:
         """Get storage network from IP"""
         if self.storage_ip:
-            parts = self.storage_ip.split('.')
-            return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
+            return self.storage_ip.rsplit('.', 1)[0] + '.0/24'
         return "10.0.2.0/24"
     
-    @property
+    @cached_property
     def config_file(self) -> Path:
         """Get configuration file path"""
         return Path("/etc/cloud-provider/node.json")
     
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Drop the cached network derived from a changed IP
+        derived = _DERIVED_NETWORKS.get(name)
+        if derived is not None:
+            self.__dict__.pop(derived, None)
+    
     def __post_init__(self):
         """Initialize derived properties"""
         if not self.hostname:
             self.hostname = socket.gethostname()
+        
+        # Preseeded installer answers; not dataclass fields so save() never writes them
+        self.preseed_phases: Optional[List[str]] = None
+        self.preseed_answers: Dict[str, bool] = {}
     
     def collect_interactive(self):
         """Collect configuration interactively"""
-        from utils.validators import (
-            validate_ip, validate_cidr, validate_interface
-        )
-        
         print("\n" + "="*60)
         print("CLOUD PROVIDER CONFIGURATION")
         print("="*60)
@@ -98,7 +119,7 @@ class NodeConfig:
             self.controller_ip = self._ask_with_validation(
                 "Enter controller node IP address",
                 "10.0.0.10",
-                validate_ip
+                validators.validate_ip
             )
         
         # Public IP block (for controller/combined nodes)
@@ -106,12 +127,12 @@ class NodeConfig:
             self.public_ip_block = self._ask_with_validation(
                 "Enter public IP block (CIDR)",
                 "203.0.113.0/24",
-                validate_cidr
+                validators.validate_cidr
             )
             self.public_gateway = self._ask_with_validation(
                 "Enter public gateway IP",
                 "203.0.113.254",
-                validate_ip
+                validators.validate_ip
             )
         
         # Storage configuration
@@ -158,13 +179,11 @@ class NodeConfig:
         print("  VLAN 4001 (internal): 10.0.1.0/24")
         print("  VLAN 4002 (storage): 10.0.2.0/24")
         
-        from utils.validators import validate_ip, validate_interface
-        
         # Management IP
         self.mgmt_ip = self._ask_with_validation(
             "Enter management IP address (VLAN 4003)",
             "",
-            validate_ip
+            validators.validate_ip
         )
         
         # Calculate derived IPs
@@ -180,25 +199,23 @@ class NodeConfig:
         self.physical_interface = self._ask_with_validation(
             "Enter physical network interface",
             detected,
-            validate_interface
+            validators.validate_interface
         )
     
     def collect_storage_config(self):
         """Collect storage configuration"""
         print("\nStorage Configuration:")
         
-        from utils.validators import validate_cidr
-        
         self.ceph_network = self._ask_with_validation(
             "Enter Ceph cluster network",
             "10.0.2.0/24",
-            validate_cidr
+            validators.validate_cidr
         )
         
         self.ceph_public_network = self._ask_with_validation(
             "Enter Ceph public network",
             "10.0.2.0/24",
-            validate_cidr
+            validators.validate_cidr
         )
         
         # Show available disks
@@ -235,6 +252,12 @@ class NodeConfig:
         
         print(summary)
     
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the persisted fields as a dict (asdict() without the deep copy)"""
+        config_dict = {name: getattr(self, name) for name in _FIELD_NAMES}
+        config_dict['ceph_disks'] = list(self.ceph_disks)
+        return config_dict
+    
     def save(self) -> bool:
         """Save configuration to file"""
         try:
@@ -242,16 +265,11 @@ class NodeConfig:
             config_dir.mkdir(parents=True, exist_ok=True)
             
             # Convert to dict
-            config_dict = asdict(self)
+            config_dict = self.to_dict()
             
             # Save as JSON
-            with open(self.config_file, 'w') as f:
-                json.dump(config_dict, f, indent=2)
-            
-            # Also save as YAML for readability
-            yaml_file = self.config_file.with_suffix('.yaml')
-            with open(yaml_file, 'w') as f:
-                yaml.dump(config_dict, f, default_flow_style=False)
+            with open(self.config_file, 'wb') as f:
+                f.write(_json_dumps(config_dict))
             
             logger.info(f"Configuration saved to {self.config_file}")
             return True
@@ -267,12 +285,12 @@ class NodeConfig:
                 logger.warning(f"Configuration file not found: {self.config_file}")
                 return False
             
-            with open(self.config_file, 'r') as f:
-                config_dict = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                config_dict = _json_loads(f.read())
             
             # Update fields
             for key, value in config_dict.items():
-                if hasattr(self, key):
+                if key in _FIELD_SET:
                     setattr(self, key, value)
             
             logger.info(f"Configuration loaded from {self.config_file}")
@@ -282,23 +300,37 @@ class NodeConfig:
             logger.error(f"Failed to load configuration: {e}")
             return False
     
-    def load_from_file(self, config_file: str) -> bool:
-        """Load configuration from specified file"""
+    def load_from_file(self, config_file: str, known_phases: Optional[Iterable[str]] = None) -> bool:
+        """Load configuration from specified file
+        
+        A preseed "phases" list is checked against known_phases when given.
+        """
         try:
             config_path = Path(config_file)
             if not config_path.exists():
                 logger.error(f"Configuration file not found: {config_file}")
                 return False
             
-            with open(config_path, 'r') as f:
+            with open(config_path, 'rb') as f:
                 if config_path.suffix.lower() == '.yaml':
-                    config_dict = yaml.safe_load(f)
+                    # Imported here so JSON-only runs never load PyYAML
+                    import yaml
+                    
+                    # Prefer the libyaml C loader when PyYAML was built with it
+                    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+                    config_dict = yaml.load(f, Loader=loader)
                 else:
-                    config_dict = json.load(f)
+                    config_dict = _json_loads(f.read())
+            
+            # Optional preseed for unattended runs: phase list and yes/no answers
+            # keyed by the exact prompt text
+            phases = _check_preseed_phases(config_dict.pop('phases', None), known_phases)
+            answers = _check_preseed_answers(config_dict.pop('answers', None))
+            self.preseed_phases, self.preseed_answers = phases, answers
             
             # Update fields
             for key, value in config_dict.items():
-                if hasattr(self, key):
+                if key in _FIELD_SET:
                     setattr(self, key, value)
             
             logger.info(f"Configuration loaded from {config_file}")
@@ -327,9 +359,11 @@ class NodeConfig:
             else:
                 print("Invalid input. Please try again.")
     
-    @staticmethod
-    def _ask_yes_no(question, default=True):
-        """Ask yes/no question"""
+    def _ask_yes_no(self, question, default=True):
+        """Ask yes/no question, using the preseeded answer if there is one"""
+        if question in self.preseed_answers:
+            return self.preseed_answers[question]
+        
         suffix = "[Y/n]" if default else "[y/N]"
         while True:
             response = input(f"{question} {suffix}: ").strip().lower()
@@ -344,23 +378,35 @@ class NodeConfig:
     @staticmethod
     def _detect_network_interface() -> str:
         """Detect primary network interface"""
+        # Default route interface: the IPv4 route with destination 0.0.0.0
         try:
-            # Try to get default route interface
+            with open('/proc/net/route') as f:
+                next(f)  # Skip header
+                for line in f:
+                    parts = line.split()
+                    if len(parts) > 1 and parts[1] == '00000000':
+                        return parts[0]
+        except (OSError, StopIteration):
+            pass
+        
+        # Fallback: first non-loopback interface
+        try:
+            for iface in sorted(os.listdir('/sys/class/net')):
+                if iface != 'lo' and not iface.startswith(('docker', 'veth')):
+                    return iface
+        except OSError:
+            pass
+        
+        # Last resort where /proc and /sys are unavailable
+        try:
+            import netifaces
             gateways = netifaces.gateways()
             if 'default' in gateways and netifaces.AF_INET in gateways['default']:
-                interface = gateways['default'][netifaces.AF_INET][1]
-                return interface
-            
-            # Fallback: first non-loopback interface
-            interfaces = netifaces.interfaces()
-            for iface in interfaces:
-                if iface != 'lo' and not iface.startswith('docker') and not iface.startswith('veth'):
-                    return iface
-            
-            return "eth0"
-            
+                return gateways['default'][netifaces.AF_INET][1]
         except Exception:
-            return "eth0"
+            pass
+        
+        return "eth0"
     
     @staticmethod
     def _show_available_disks():
@@ -368,12 +414,67 @@ class NodeConfig:
         import subprocess
         try:
             result = subprocess.run(
-                ['lsblk', '-d', '-o', 'NAME,SIZE,TYPE,MODEL'],
+                ['lsblk', '-J', '-d', '-o', 'NAME,SIZE,TYPE,MODEL'],
                 capture_output=True,
                 text=True
             )
-            for line in result.stdout.strip().split('\n')[1:]:  # Skip header
-                if 'disk' in line.lower() and not any(x in line.lower() for x in ['sda', 'vda', 'loop', 'rom']):
-                    print(f"  {line}")
+            for disk in _json_loads(result.stdout)['blockdevices']:
+                name = disk['name']
+                # Skip the usual system disks, loop devices and optical drives
+                if disk['type'] != 'disk' or name in ('sda', 'vda') or name.startswith(('loop', 'sr')):
+                    continue
+                print(f"  {name:<10} {disk['size'] or '':>8}  {(disk.get('model') or '').strip()}")
         except Exception as e:
-            print(f"  Error listing disks: {e}")
\ No newline at end of file
+            print(f"  Error listing disks: {e}")
+
+
+# Cached network properties keyed by the IP field they derive from
+_DERIVED_NETWORKS = {
+    'mgmt_ip': 'mgmt_network',
+    'internal_ip': 'internal_network',
+    'storage_ip': 'storage_network',
+}
+
+# Persisted field names, resolved once instead of on every save()/load()
+_FIELD_NAMES = tuple(f.name for f in fields(NodeConfig))
+_FIELD_SET = frozenset(_FIELD_NAMES)
+
+# Accepted preseed answer strings; anything else is rejected rather than
+# falling back to truthiness, which would read "no" as yes
+_PRESEED_ANSWER_WORDS = {
+    'y': True, 'yes': True, 'true': True,
+    'n': False, 'no': False, 'false': False,
+}
+
+
+def _check_preseed_phases(phases, known_phases: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Validate a preseed phase list; raises ValueError"""
+    if phases is None:
+        return None
+    if not isinstance(phases, list) or not all(isinstance(p, str) for p in phases):
+        raise ValueError("preseed 'phases' must be a list of phase names")
+    if not phases:
+        raise ValueError("preseed 'phases' is empty; omit it to run every phase")
+    if known_phases is not None:
+        known = frozenset(known_phases)
+        unknown = [p for p in phases if p not in known]
+        if unknown:
+            raise ValueError(f"unknown phase(s) in preseed 'phases': {', '.join(unknown)}")
+    return phases
+
+
+def _check_preseed_answers(answers) -> Dict[str, bool]:
+    """Validate preseed answers into booleans; raises ValueError"""
+    if answers is None:
+        return {}
+    if not isinstance(answers, dict):
+        raise ValueError("preseed 'answers' must map prompts to yes/no answers")
+    
+    checked = {}
+    for question, answer in answers.items():
+        if isinstance(answer, str):
+            answer = _PRESEED_ANSWER_WORDS.get(answer.strip().lower(), answer)
+        if not isinstance(answer, bool):
+            raise ValueError(f"preseed answer for {question!r} must be yes or no, got {answer!r}")
+        checked[question] = answer
+    return checked
@@ -4,15 +4,140 @@ phases/base_phase.py - Base phase class
 """
 
 import abc
+import functools
 import logging
+import re
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
 
 from utils.shell import run_command, CommandResult
 from utils.logging import PhaseLogger
 
 
+# ${config.key} / ${config.key.subkey} placeholders for template_render()
+_PLACEHOLDER_RE = re.compile(r'\$\{config\.([^}]+)\}')
+
+# Netplan layouts per node type, filled in with str.format()
+_CONTROLLER_NETPLAN_TMPL = """network:
+  version: 2
+  renderer: networkd
+  ethernets:
+    {iface}:
+      dhcp4: no
+      dhcp6: no
+      
+  vlans:
+    mgmt:
+      id: 4003
+      link: {iface}
+      addresses: [{mgmt_ip}/24]
+      routes:
+        - to: 0.0.0.0/0
+          via: 10.0.0.1
+      nameservers:
+        addresses: [8.8.8.8, 1.1.1.1]
+      
+    external:
+      id: 4000
+      link: {iface}
+      addresses: []
+      mtu: 1500
+      
+    internal:
+      id: 4001
+      link: {iface}
+      addresses: [{internal_ip}/24]
+      mtu: 9000
+      
+    storage:
+      id: 4002
+      link: {iface}
+      addresses: [{storage_ip}/24]
+      mtu: 9000
+"""
+
+_COMPUTE_NETPLAN_TMPL = """network:
+  version: 2
+  renderer: networkd
+  ethernets:
+    {iface}:
+      dhcp4: no
+      dhcp6: no
+      
+  vlans:
+    mgmt:
+      id: 4003
+      link: {iface}
+      addresses: [{mgmt_ip}/24]
+      routes:
+        - to: 0.0.0.0/0
+          via: 10.0.0.1
+      nameservers:
+        addresses: [8.8.8.8, 1.1.1.1]
+      
+    internal:
+      id: 4001
+      link: {iface}
+      addresses: [{internal_ip}/24]
+      mtu: 9000
+      
+    storage:
+      id: 4002
+      link: {iface}
+      addresses: [{storage_ip}/24]
+      mtu: 9000
+"""
+
+_STORAGE_NETPLAN_TMPL = """network:
+  version: 2
+  renderer: networkd
+  ethernets:
+    {iface}:
+      dhcp4: no
+      dhcp6: no
+      
+  vlans:
+    mgmt:
+      id: 4003
+      link: {iface}
+      addresses: [{mgmt_ip}/24]
+      routes:
+        - to: 0.0.0.0/0
+          via: 10.0.0.1
+      nameservers:
+        addresses: [8.8.8.8, 1.1.1.1]
+      
+    storage:
+      id: 4002
+      link: {iface}
+      addresses: [{storage_ip}/24]
+      mtu: 9000
+"""
+
+_NETPLAN_TEMPLATES = {
+    'controller': _CONTROLLER_NETPLAN_TMPL,
+    'compute': _COMPUTE_NETPLAN_TMPL,
+    'storage': _STORAGE_NETPLAN_TMPL,
+    # Combined nodes use the controller layout
+    'combined': _CONTROLLER_NETPLAN_TMPL,
+}
+
+
+@functools.lru_cache(maxsize=8)
+def _render_netplan(node_type: str, iface: str, mgmt_ip: str,
+                    internal_ip: str, storage_ip: str) -> str:
+    """Render the netplan YAML for a node; cached since phases ask for the same one"""
+    if node_type not in _NETPLAN_TEMPLATES:
+        raise ValueError(f"Unknown node type: {node_type}")
+    return _NETPLAN_TEMPLATES[node_type].format(
+        iface=iface,
+        mgmt_ip=mgmt_ip,
+        internal_ip=internal_ip,
+        storage_ip=storage_ip,
+    )
+
+
 class BasePhase(abc.ABC):
     """Base class for all installation phases"""
     
@@ -23,47 +148,47 @@ class BasePhase(abc.ABC):
         self.phase_logger = PhaseLogger(self.name)
         
         # Phase metadata
-        self.started_at = None
-        self.completed_at = None
+        self._t0_ns = 0
+        self.duration = None  # Seconds, set when the phase finishes
         self.success = False
     
     def run(self) -> bool:
         """Run the phase"""
-        self.started_at = datetime.now()
-        self.phase_logger.start()
-        
-        self.logger.info(f"Starting phase: {self.name}")
+        self._t0_ns = time.monotonic_ns()
         
-        try:
-            # Run pre-check
-            if not self.pre_check():
-                self.logger.error(f"Pre-check failed for phase: {self.name}")
-                return False
+        with self.phase_logger:
+            self.logger.info(f"Starting phase: {self.name}")
             
-            # Execute phase
-            result = self.execute()
+            try:
+                # Run pre-check
+                if not self.pre_check():
+                    self.logger.error(f"Pre-check failed for phase: {self.name}")
+                    return False
             
-            # Run post-check
-            if result:
-                result = self.post_check()
+                # Execute phase
+                result = self.execute()
             
-            self.success = result
-            return result
+                # Run post-check
+                if result:
+                    result = self.post_check()
             
-        except Exception as e:
-            self.logger.error(f"Phase '{self.name}' failed with error: {e}")
-            import traceback
-            self.logger.debug(traceback.format_exc())
-            return False
+                self.success = result
+                return result
             
-        finally:
-            self.completed_at = datetime.now()
-            self.phase_logger.end(self.success)
+            except Exception as e:
+                self.logger.error(f"Phase '{self.name}' failed with error: {e}")
+                import traceback
+                self.logger.debug(traceback.format_exc())
+                return False
             
-            if self.success:
-                self.logger.info(f"Phase '{self.name}' completed successfully")
-            else:
-                self.logger.error(f"Phase '{self.name}' failed")
+            finally:
+                self.duration = (time.monotonic_ns() - self._t0_ns) / 1e9
+                self.phase_logger.end(self.success, self.duration)
+            
+                if self.success:
+                    self.logger.info(f"Phase '{self.name}' completed successfully")
+                else:
+                    self.logger.error(f"Phase '{self.name}' failed")
     
     @abc.abstractmethod
     def execute(self) -> bool:
@@ -83,15 +208,21 @@ class BasePhase(abc.ABC):
         """Run post-execution verification"""
         return True
     
-    def run_command(self, cmd: str, check: bool = True, **kwargs) -> CommandResult:
-        """Run shell command with logging"""
-        self.logger.debug(f"Running command: {cmd}")
+    def run_command(self, cmd: Union[str, List[str]], check: bool = True, **kwargs) -> CommandResult:
+        """Run shell command (utils.shell logs it)"""
         return run_command(cmd, check=check, **kwargs)
     
     def write_file(self, path: str, content: str, mode: str = 'w'):
         """Write content to file with backup"""
         file_path = Path(path)
         
+        # Idempotent reruns: leave an identical file (and its backup) alone
+        if 'w' in mode and file_path.is_file():
+            data = content if isinstance(content, bytes) else content.encode()
+            if file_path.stat().st_size == len(data) and file_path.read_bytes() == data:
+                self.logger.debug(f"{path} unchanged, skipping write")
+                return
+        
         # Backup existing file
         if file_path.exists():
             backup_path = file_path.with_suffix(f"{file_path.suffix}.backup")
@@ -117,130 +248,24 @@ class BasePhase(abc.ABC):
             **kwargs
         }
         
-        # Simple template rendering
-        result = template
+        # Flatten to dotted keys, then substitute every placeholder in one pass
+        values = {}
         for key, value in context.items():
             if isinstance(value, dict):
                 # Handle nested dicts
                 for subkey, subvalue in value.items():
-                    result = result.replace(f'${{config.{key}.{subkey}}}', str(subvalue))
+                    values[f'{key}.{subkey}'] = str(subvalue)
             else:
-                result = result.replace(f'${{config.{key}}}', str(value))
+                values[key] = str(value)
         
-        return result
+        return _PLACEHOLDER_RE.sub(lambda m: values.get(m.group(1), m.group(0)), template)
     
     def get_netplan_config(self) -> str:
         """Get Netplan configuration based on node type"""
-        templates = {
-            'controller': self._get_controller_netplan,
-            'compute': self._get_compute_netplan,
-            'storage': self._get_storage_netplan,
-            'combined': self._get_combined_netplan,
-        }
-        
-        if self.config.node_type in templates:
-            return templates[self.config.node_type]()
-        else:
-            raise ValueError(f"Unknown node type: {self.config.node_type}")
-    
-    def _get_controller_netplan(self) -> str:
-        return f"""network:
-  version: 2
-  renderer: networkd
-  ethernets:
-    {self.config.physical_interface}:
-      dhcp4: no
-      dhcp6: no
-      
-  vlans:
-    mgmt:
-      id: 4003
-      link: {self.config.physical_interface}
-      addresses: [{self.config.mgmt_ip}/24]
-      routes:
-        - to: 0.0.0.0/0
-          via: 10.0.0.1
-      nameservers:
-        addresses: [8.8.8.8, 1.1.1.1]
-      
-    external:
-      id: 4000
-      link: {self.config.physical_interface}
-      addresses: []
-      mtu: 1500
-      
-    internal:
-      id: 4001
-      link: {self.config.physical_interface}
-      addresses: [{self.config.internal_ip}/24]
-      mtu: 9000
-      
-    storage:
-      id: 4002
-      link: {self.config.physical_interface}
-      addresses: [{self.config.storage_ip}/24]
-      mtu: 9000
-"""
-    
-    def _get_compute_netplan(self) -> str:
-        return f"""network:
-  version: 2
-  renderer: networkd
-  ethernets:
-    {self.config.physical_interface}:
-      dhcp4: no
-      dhcp6: no
-      
-  vlans:
-    mgmt:
-      id: 4003
-      link: {self.config.physical_interface}
-      addresses: [{self.config.mgmt_ip}/24]
-      routes:
-        - to: 0.0.0.0/0
-          via: 10.0.0.1
-      nameservers:
-        addresses: [8.8.8.8, 1.1.1.1]
-      
-    internal:
-      id: 4001
-      link: {self.config.physical_interface}
-      addresses: [{self.config.internal_ip}/24]
-      mtu: 9000
-      
-    storage:
-      id: 4002
-      link: {self.config.physical_interface}
-      addresses: [{self.config.storage_ip}/24]
-      mtu: 9000
-"""
-    
-    def _get_storage_netplan(self) -> str:
-        return f"""network:
-  version: 2
-  renderer: networkd
-  ethernets:
-    {self.config.physical_interface}:
-      dhcp4: no
-      dhcp6: no
-      
-  vlans:
-    mgmt:
-      id: 4003
-      link: {self.config.physical_interface}
-      addresses: [{self.config.mgmt_ip}/24]
-      routes:
-        - to: 0.0.0.0/0
-          via: 10.0.0.1
-      nameservers:
-        addresses: [8.8.8.8, 1.1.1.1]
-      
-    storage:
-      id: 4002
-      link: {self.config.physical_interface}
-      addresses: [{self.config.storage_ip}/24]
-      mtu: 9000
-"""
-    
-    def _get_combined_netplan(self) -> str:
-        return self._get_controller_netplan()
\ No newline at end of file
+        return _render_netplan(
+            self.config.node_type,
+            self.config.physical_interface,
+            self.config.mgmt_ip,
+            self.config.internal_ip,
+            self.config.storage_ip,
+        )
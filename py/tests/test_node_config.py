@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from config.node_config import NodeConfig
+
+PHASES = ('preflight', 'system_prep', 'network')
+
+
+def _load(tmp_path, preseed):
+    path = tmp_path / 'preseed.json'
+    path.write_text(json.dumps(preseed))
+    config = NodeConfig(hostname='node1')
+    return config, config.load_from_file(str(path), PHASES)
+
+
+@pytest.mark.parametrize('answer, expected', [
+    (True, True), (False, False), ('yes', True), ('No', False), ('false', False), ('y', True),
+])
+def test_preseed_answers_are_booleans(tmp_path, answer, expected):
+    config, loaded = _load(tmp_path, {'answers': {'Load it?': answer}})
+    
+    assert loaded
+    assert config._ask_yes_no('Load it?') is expected
+
+
+@pytest.mark.parametrize('answers', [{'Load it?': 'maybe'}, {'Load it?': 1}, ['Load it?']])
+def test_bad_preseed_answers_are_rejected(tmp_path, answers):
+    config, loaded = _load(tmp_path, {'answers': answers, 'mgmt_ip': '10.0.0.5'})
+    
+    assert not loaded
+    assert config.preseed_answers == {}
+    assert config.mgmt_ip == ''
+
+
+def test_preseed_phases_are_loaded(tmp_path):
+    config, loaded = _load(tmp_path, {'phases': ['network', 'preflight']})
+    
+    assert loaded
+    assert config.preseed_phases == ['network', 'preflight']
+
+
+@pytest.mark.parametrize('phases', [['network', 'bogus'], 'network', [1], []])
+def test_bad_preseed_phases_are_rejected(tmp_path, phases):
+    config, loaded = _load(tmp_path, {'phases': phases})
+    
+    assert not loaded
+    assert config.preseed_phases is None
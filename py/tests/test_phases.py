@@ -0,0 +1,108 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class StubPhase:
+    """Records start/end order instead of installing anything"""
+    
+    events = []
+    results = {}
+    
+    def __init__(self, config):
+        self.config = config
+    
+    def run(self):
+        self.events.append(('start', self.name))
+        self.events.append(('end', self.name))
+        return self.results.get(self.name, True)
+
+
+def _stub(name):
+    return type(f'{name.title()}Phase', (StubPhase,), {'name': name})
+
+
+_STUB_NAMES = {
+    'PreflightPhase': 'preflight',
+    'SystemPrepPhase': 'system_prep',
+    'NetworkPhase': 'network',
+    'ControllerPhase': 'controller',
+    'ComputePhase': 'compute',
+    'PostInstallPhase': 'post_install',
+    'VerificationPhase': 'verification',
+}
+
+
+@pytest.fixture
+def installer_module(monkeypatch):
+    stubs = types.ModuleType('phases')
+    for attr, name in _STUB_NAMES.items():
+        setattr(stubs, attr, _stub(name))
+    monkeypatch.setitem(sys.modules, 'phases', stubs)
+    monkeypatch.delitem(sys.modules, 'cloud_installer', raising=False)
+    
+    import cloud_installer
+    
+    StubPhase.events = []
+    StubPhase.results = {}
+    return cloud_installer
+
+
+def _starts(events):
+    return [name for kind, name in events if kind == 'start']
+
+
+def test_all_phases_run_in_order(installer_module):
+    installer_module.CloudInstaller(interactive=False).run_phases(list(installer_module.PHASE_ORDER))
+    
+    expected = []
+    for name in installer_module.PHASE_ORDER:
+        expected += [('start', name), ('end', name)]
+    assert StubPhase.events == expected
+
+
+def test_skipped_phase_is_not_run(installer_module):
+    # What the skip:network menu option selects
+    selected = [p for p in installer_module.PHASE_ORDER if p != 'network']
+    installer_module.CloudInstaller(interactive=False).run_phases(selected)
+    
+    assert _starts(StubPhase.events) == selected
+
+
+def test_phases_run_in_the_order_given(installer_module):
+    installer_module.CloudInstaller(interactive=False).run_phases(['verification', 'preflight'])
+    
+    assert _starts(StubPhase.events) == ['verification', 'preflight']
+
+
+def test_failed_phase_does_not_stop_non_interactive_run(installer_module):
+    StubPhase.results = {'network': False}
+    
+    installer_module.CloudInstaller(interactive=False).run_phases(['network', 'controller'])
+    
+    assert _starts(StubPhase.events) == ['network', 'controller']
+
+
+def test_unknown_phases_are_skipped(installer_module):
+    installer_module.CloudInstaller(interactive=False).run_phases(['bogus', 'preflight'])
+    
+    assert StubPhase.events == [('start', 'preflight'), ('end', 'preflight')]
+
+
+@pytest.mark.parametrize('interactive', [True, False])
+def test_bad_config_file_aborts_before_prompting(installer_module, tmp_path, monkeypatch, interactive):
+    path = tmp_path / 'preseed.json'
+    path.write_text('{"phases": []}')
+    monkeypatch.setattr('builtins.input', lambda prompt='': pytest.fail(f"prompted: {prompt}"))
+    
+    installer = installer_module.CloudInstaller(interactive=interactive)
+    run = installer.run_interactive if interactive else installer.run_non_interactive
+    with pytest.raises(SystemExit) as exc:
+        run(str(path))
+    
+    assert exc.value.code == 1
+    assert StubPhase.events == []
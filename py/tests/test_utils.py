@@ -0,0 +1,140 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import shell
+
+
+def test_streamed_timeout_not_held_by_grandchild():
+    # The backgrounded sleep inherits stdout/stderr and outlives the shell
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        shell.run_command(['sh', '-c', 'sleep 5 & sleep 5'], timeout=1, max_capture_bytes=100)
+    assert time.monotonic() - start < 3
+
+
+def test_streamed_timeout_covers_grandchild_holding_pipes():
+    # The shell exits at once; its backgrounded sleep keeps the pipes open
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        shell.run_command(['sh', '-c', 'sleep 4 & echo hi'], timeout=1, max_capture_bytes=100)
+    assert time.monotonic() - start < 3
+
+
+def test_streamed_output_keeps_tail():
+    lines = []
+    result = shell.run_command(
+        ['sh', '-c', 'seq 1 1000; echo oops >&2; exit 3'],
+        check=False,
+        on_stdout_line=lines.append,
+        max_capture_bytes=20,
+    )
+    
+    assert result.returncode == 3
+    assert len(lines) == 1000
+    assert result.stdout.splitlines()[-1] == '1000'
+    assert len(result.stdout) <= 20
+    assert result.stderr == 'oops'
+
+
+def test_streamed_capture_limit_counts_bytes():
+    # Each line is 2 characters but 5 bytes in UTF-8
+    result = shell.run_command(
+        ['sh', '-c', 'for i in 1 2 3 4 5 6; do echo "€$i"; done'],
+        max_capture_bytes=12,
+    )
+    
+    assert result.stdout.splitlines() == ['€5', '€6']
+
+
+def _fake_systemctl_show(monkeypatch, stdout: bytes):
+    calls = []
+    
+    def run_command(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[1] == 'show':
+            return shell.CommandResult(True, 0, stdout, b'', args=cmd)
+        return shell.CommandResult(True, 0, '', '', args=cmd)
+    
+    monkeypatch.setattr(shell, 'run_command', run_command)
+    monkeypatch.setattr(shell._SystemdDbus, 'get', classmethod(lambda cls: None))
+    return calls
+
+
+def test_systemctl_many_disable_keys_states_by_unit(monkeypatch):
+    # The missing unit sits between the others; b is still enabled
+    _fake_systemctl_show(monkeypatch, (
+        b'Names=a.service\nActiveState=inactive\nUnitFileState=disabled\n\n'
+        b'Names=missing.service\nActiveState=inactive\nUnitFileState=\n\n'
+        b'Names=b.service b-alias.service\nActiveState=active\nUnitFileState=enabled\n'
+    ))
+    
+    assert shell.systemctl_many(['a', 'missing', 'b'], 'disable') == {
+        'a': True, 'missing': True, 'b': False,
+    }
+
+
+def test_systemctl_many_unreported_unit_is_failure(monkeypatch):
+    _fake_systemctl_show(monkeypatch, b'Names=a.service\nActiveState=active\nUnitFileState=enabled\n')
+    
+    assert shell.systemctl_many(['a', 'b.service'], 'status') == {'a': True, 'b.service': False}
+    assert shell.systemctl_many(['a', 'b.service'], 'disable') == {'a': False, 'b.service': False}
+
+
+def test_which_cache_expires_even_when_watched(tmp_path, monkeypatch):
+    # A directory created after the first lookup isn't watched; the TTL still applies
+    missing = tmp_path / 'bin'
+    monkeypatch.setenv('PATH', str(missing))
+    assert shell._which('late-tool') is None
+    
+    missing.mkdir()
+    tool = missing / 'late-tool'
+    tool.write_text('#!/bin/sh\n')
+    tool.chmod(0o755)
+    assert shell._which('late-tool') is None  # Still cached
+    
+    monkeypatch.setattr(shell, '_which_cache_time', time.monotonic() - shell.WHICH_CACHE_TTL - 1)
+    assert shell._which('late-tool') == str(tool)
+
+
+def test_systemd_batch_keeps_body_error_and_pending_reload(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(shell, '_daemon_reload', lambda: reloads.append(1))
+    monkeypatch.setattr(shell, '_needs_reload', True)
+    
+    with pytest.raises(KeyError):
+        with shell.systemd_batch():
+            raise KeyError('body')
+    
+    assert reloads == []
+    shell.flush_systemd_reloads()
+    assert reloads == [1]
+
+
+def test_nested_systemd_batch_reloads_once(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(shell, '_daemon_reload', lambda: reloads.append(1))
+    monkeypatch.setattr(shell, '_needs_reload', True)
+    
+    with shell.systemd_batch():
+        with shell.systemd_batch():
+            pass
+        assert reloads == []
+    
+    assert reloads == [1]
+
+
+def test_command_result_accepts_command_or_args():
+    by_text = shell.CommandResult(True, 0, '', '', command='echo hi')
+    by_argv = shell.CommandResult(True, 0, '', '', args=['echo', 'a b'])
+    
+    assert by_text.command == 'echo hi'
+    assert by_text.args == 'echo hi'
+    assert by_argv.command == "echo 'a b'"
+    with pytest.raises(TypeError):
+        shell.CommandResult(True, 0, '', '')
@@ -5,6 +5,8 @@ utils/logging.py - Logging utilities
 
 import logging
 import sys
+import time
+from logging.handlers import MemoryHandler
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
@@ -42,31 +44,46 @@ def setup_logging(level=logging.INFO, log_file: Optional[Path] = None):
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
     
-    # Clear existing handlers
+    # Clear existing handlers (closing flushes any buffered records)
+    for handler in root_logger.handlers:
+        handler.close()
     root_logger.handlers.clear()
     
-    # Console handler (colored)
+    plain_formatter = logging.Formatter(
+        '[%(asctime)s] [%(levelname)-8s] [%(name)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    
+    # Console handler (colored on a terminal, plain when piped or redirected)
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(ColorFormatter())
+    console_handler.setFormatter(ColorFormatter() if sys.stdout.isatty() else plain_formatter)
     console_handler.setLevel(level)
     root_logger.addHandler(console_handler)
     
     # File handler
     file_handler = logging.FileHandler(log_file)
-    file_formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)-8s] [%(name)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(plain_formatter)
     file_handler.setLevel(logging.DEBUG)  # Always debug to file
-    root_logger.addHandler(file_handler)
+    
+    # Buffer file writes; errors flush straight away, and logging's atexit
+    # shutdown flushes whatever is left
+    buffered_handler = MemoryHandler(
+        capacity=512,
+        flushLevel=logging.ERROR,
+        target=file_handler
+    )
+    root_logger.addHandler(buffered_handler)
     
     # Log startup message
     logging.info(f"Logging initialized. File: {log_file}")
 
 
 class PhaseLogger:
-    """Logger for individual phases"""
+    """Logger for individual phases
+    
+    The log file stays open from start() to end(); use it as a context
+    manager to make sure the handle is closed if the phase raises.
+    """
     
     def __init__(self, phase_name: str):
         self.phase_name = phase_name
@@ -74,36 +91,66 @@ class PhaseLogger:
         self.phase_dir.mkdir(parents=True, exist_ok=True)
         
         self.log_file = self.phase_dir / f"{phase_name}.log"
-        self.start_time = None
+        self.start_time = None  # Wall clock, for the log header only
         self.end_time = None
+        self._t0_ns = None
+        self._fh = None
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    def _write(self, text: str):
+        if self._fh is not None:
+            self._fh.write(text)
+        else:
+            # Not started: append directly, as before
+            with open(self.log_file, 'a') as f:
+                f.write(text)
     
     def start(self):
         """Start phase logging"""
         self.start_time = datetime.now()
-        with open(self.log_file, 'a') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"PHASE: {self.phase_name.upper()}\n")
-            f.write(f"START: {self.start_time}\n")
-            f.write(f"{'='*60}\n\n")
-    
-    def end(self, success: bool):
-        """End phase logging"""
+        self._t0_ns = time.monotonic_ns()
+        if self._fh is None:
+            self._fh = open(self.log_file, 'a', buffering=8192)
+        self._write(
+            f"\n{'='*60}\n"
+            f"PHASE: {self.phase_name.upper()}\n"
+            f"START: {self.start_time}\n"
+            f"{'='*60}\n\n"
+        )
+    
+    def end(self, success: bool, duration: Optional[float] = None):
+        """End phase logging; ``duration`` (seconds) defaults to the time since start()"""
         self.end_time = datetime.now()
-        duration = (self.end_time - self.start_time).total_seconds() if self.start_time else 0
+        if duration is None:
+            duration = (time.monotonic_ns() - self._t0_ns) / 1e9 if self._t0_ns is not None else 0
         
-        with open(self.log_file, 'a') as f:
-            f.write(f"\n{'='*60}\n")
-            f.write(f"END: {self.end_time}\n")
-            f.write(f"DURATION: {duration:.2f}s\n")
-            f.write(f"STATUS: {'SUCCESS' if success else 'FAILED'}\n")
-            f.write(f"{'='*60}\n")
+        self._write(
+            f"\n{'='*60}\n"
+            f"END: {self.end_time}\n"
+            f"DURATION: {duration:.2f}s\n"
+            f"STATUS: {'SUCCESS' if success else 'FAILED'}\n"
+            f"{'='*60}\n"
+        )
+        self.close()
+    
+    def close(self):
+        """Flush and close the log file"""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
     
     def log_command(self, command: str, output: str = "", error: str = ""):
         """Log command execution"""
-        with open(self.log_file, 'a') as f:
-            f.write(f"$ {command}\n")
-            if output:
-                f.write(f"{output}\n")
-            if error:
-                f.write(f"ERROR: {error}\n")
-            f.write(f"{'-'*40}\n")
\ No newline at end of file
+        entry = f"$ {command}\n"
+        if output:
+            entry += f"{output}\n"
+        if error:
+            entry += f"ERROR: {error}\n"
+        self._write(entry + f"{'-'*40}\n")
\ No newline at end of file
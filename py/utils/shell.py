@@ -3,190 +3,888 @@
 utils/shell.py - Shell command execution utilities
 """
 
+import asyncio
+import functools
+import os
+import selectors
+import shutil
 import subprocess
 import shlex
 import logging
-from dataclasses import dataclass
-from typing import Optional, List, Union
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Optional, List, Union, Dict, Tuple, Callable, Mapping
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# shutil.which() results keyed by (command, PATH)
+_WHICH_CACHE: Dict[Tuple[str, str], Optional[str]] = {}
 
-@dataclass
+# Seconds a lookup is trusted; inotify clears sooner, this is the backstop
+# for PATH entries it couldn't watch (missing at first lookup, no inotify)
+WHICH_CACHE_TTL = 60
+
+_which_lock = threading.Lock()
+_path_watch = None  # inotify_simple.INotify once started, False if unavailable
+_watched_paths = set()
+_watched_dirs = set()
+_which_cache_time = time.monotonic()
+
+
+def _path_watch_loop(inotify):
+    """Drop cached lookups whenever a watched PATH directory changes"""
+    while True:
+        if inotify.read():
+            _WHICH_CACHE.clear()
+
+
+def _watch_path(path: str):
+    """Start inotify watches on the directories of a PATH value"""
+    global _path_watch
+    
+    with _which_lock:
+        _watched_paths.add(path)
+        
+        if _path_watch is None:
+            try:
+                from inotify_simple import INotify
+                _path_watch = INotify()
+            except Exception:  # not installed, or no inotify instances left
+                _path_watch = False
+            else:
+                threading.Thread(
+                    target=_path_watch_loop, args=(_path_watch,), name='path-watch', daemon=True,
+                ).start()
+        
+        if not _path_watch:
+            return
+        
+        from inotify_simple import flags
+        # ATTRIB catches chmod +x, which changes what shutil.which() accepts
+        mask = flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | flags.ATTRIB
+        for directory in path.split(os.pathsep):
+            if directory and directory not in _watched_dirs:
+                try:
+                    _path_watch.add_watch(directory, mask)
+                except OSError:
+                    continue  # Missing PATH entries are common; retried after the TTL
+                _watched_dirs.add(directory)
+    
+    # Entries cached before the watches existed may be stale
+    _WHICH_CACHE.clear()
+
+
+def _which(cmd: str) -> Optional[str]:
+    """Resolve a command in PATH, memoized until PATH directories change or the TTL"""
+    global _which_cache_time
+    
+    now = time.monotonic()
+    if now - _which_cache_time > WHICH_CACHE_TTL:
+        _WHICH_CACHE.clear()
+        _watched_paths.clear()  # Re-try watches on directories that were missing
+        _which_cache_time = now
+    
+    path = os.environ.get('PATH', '')
+    if path not in _watched_paths:
+        _watch_path(path)
+    
+    key = (cmd, path)
+    try:
+        return _WHICH_CACHE[key]
+    except KeyError:
+        path = _WHICH_CACHE[key] = shutil.which(cmd)
+        return path
+
+
+# Tail kept for error reporting when streaming verbose commands
+MAX_CAPTURE_BYTES = 64 * 1024
+
+
+@functools.lru_cache(maxsize=32)
+def _merged_env(extra: frozenset) -> Mapping[str, str]:
+    return MappingProxyType({**os.environ, **dict(extra)})
+
+
+def prepare_env(extra: Dict[str, str]) -> Mapping[str, str]:
+    """os.environ plus extra, merged once and cached for reuse as run_command(env=...)
+    
+    The result is read-only and reflects os.environ as of the first call
+    with the same extra variables.
+    """
+    return _merged_env(frozenset(extra.items()))
+
+
+@dataclass(slots=True, init=False)
 class CommandResult:
-    """Result of command execution"""
+    """Result of command execution
+    
+    Built with either command (the text, as before) or args (the argv or
+    string passed to run_command(), turned into text only if asked for).
+    """
     success: bool
     returncode: int
-    stdout: str
-    stderr: str
-    command: str
+    stdout: Union[str, bytes]  # bytes with run_command(binary=True)
+    stderr: Union[str, bytes]
+    args: Union[str, List[str]]  # As passed to run_command()
+    _command: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    def __init__(
+        self,
+        success: bool,
+        returncode: int,
+        stdout: Union[str, bytes],
+        stderr: Union[str, bytes],
+        command: Optional[str] = None,
+        *,
+        args: Union[str, List[str], None] = None,
+    ):
+        if command is None and args is None:
+            raise TypeError("CommandResult needs command or args")
+        self.success = success
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.args = command if args is None else args
+        self._command = command
+    
+    @property
+    def command(self) -> str:
+        """The command as text, built on first use
+        
+        Shell-safe: shlex.split() of it gives back the argv that was run.
+        """
+        if self._command is None:
+            self._command = _cmd_text(self.args)
+        return self._command
+
+
+def _cmd_text(cmd: Union[str, List[str]]) -> str:
+    """Quote an argv with shlex.join(); strings were shlex-split, so keep them"""
+    return cmd if isinstance(cmd, str) else shlex.join(cmd)
+
+
+def _command_result(
+    cmd_list: List[str],
+    cmd: Union[str, List[str]],
+    returncode: int,
+    stdout: Union[str, bytes, None],
+    stderr: Union[str, bytes, None],
+    capture_output: bool,
+    check: bool,
+    binary: bool = False,
+) -> CommandResult:
+    """Build, log and (with check) enforce the result of a finished command"""
+    if not capture_output:
+        stdout = stderr = b'' if binary else ''
+    elif not binary:
+        stdout, stderr = stdout.strip(), stderr.strip()
+    
+    # Create result object
+    cmd_result = CommandResult(
+        success=returncode == 0,
+        returncode=returncode,
+        stdout=stdout,
+        stderr=stderr,
+        args=cmd,
+    )
+    
+    # Log result
+    if cmd_result.success:
+        if cmd_result.stdout and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Command output: %s...", cmd_result.stdout[:200])
+    else:
+        logger.error("Command failed (exit=%s): %s", cmd_result.returncode, cmd_result.command)
+        if cmd_result.stderr:
+            logger.error("Error output: %s", cmd_result.stderr)
+    
+    # Raise exception if check is True and command failed
+    if check and not cmd_result.success:
+        raise subprocess.CalledProcessError(
+            cmd_result.returncode,
+            cmd_list,
+            cmd_result.stdout,
+            cmd_result.stderr,
+        )
+    
+    return cmd_result
 
 
 def run_command(
     cmd: Union[str, List[str]],
     check: bool = True,
     cwd: Optional[Path] = None,
-    env: Optional[dict] = None,
+    env: Optional[Mapping[str, str]] = None,
     timeout: Optional[int] = 300,
     capture_output: bool = True,
+    on_stdout_line: Optional[Callable[[str], None]] = None,
+    max_capture_bytes: Optional[int] = None,
+    binary: bool = False,
 ) -> CommandResult:
     """
     Run shell command with proper error handling and logging
     
     Args:
-        cmd: Command to run (string or list)
+        cmd: Command to run; an argv list is used as-is, a string is
+            shlex-split (no shell either way)
         check: Raise exception if command fails
         cwd: Working directory
         env: Environment variables
         timeout: Command timeout in seconds
-        capture_output: Capture stdout/stderr
+        capture_output: Capture stdout/stderr; when False they are discarded
+        on_stdout_line: Called with each stdout line as it arrives
+        max_capture_bytes: Keep only roughly this much of the tail of each
+            stream instead of the whole output
+        binary: Return stdout/stderr as raw bytes, undecoded and unstripped
+            (not combined with on_stdout_line/max_capture_bytes)
     
     Returns:
         CommandResult object
     """
     # Convert command to list if it's a string
-    if isinstance(cmd, str):
-        cmd_str = cmd
-        cmd_list = shlex.split(cmd)
-    else:
-        cmd_str = ' '.join(cmd)
-        cmd_list = cmd
+    cmd_list = shlex.split(cmd) if isinstance(cmd, str) else cmd
     
-    logger.debug(f"Executing: {cmd_str}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Executing: %s", _cmd_text(cmd))
     
     try:
         # Prepare subprocess arguments
         kwargs = {
-            'cwd': str(cwd) if cwd else None,
+            'cwd': os.fspath(cwd) if cwd is not None else None,
             'env': env,
             'timeout': timeout,
+            # Python's own fds are non-inheritable (PEP 446); with close_fds
+            # off, an absolute executable and no cwd, CPython can use
+            # posix_spawn() instead of fork/exec
+            'close_fds': False,
         }
         
+        if env is None and cmd_list and '/' not in cmd_list[0]:
+            executable = _which(cmd_list[0])
+            if executable:
+                kwargs['executable'] = executable
+        
         if capture_output:
             kwargs['stdout'] = subprocess.PIPE
             kwargs['stderr'] = subprocess.PIPE
-            kwargs['text'] = True
+            kwargs['text'] = not binary
+        else:
+            # Only the exit status is wanted: no pipes, no decoding
+            kwargs['stdout'] = subprocess.DEVNULL
+            kwargs['stderr'] = subprocess.DEVNULL
         
         # Execute command
-        result = subprocess.run(cmd_list, **kwargs)
-        
-        # Create result object
-        cmd_result = CommandResult(
-            success=result.returncode == 0,
-            returncode=result.returncode,
-            stdout=result.stdout.strip() if capture_output else '',
-            stderr=result.stderr.strip() if capture_output else '',
-            command=cmd_str,
-        )
-        
-        # Log result
-        if cmd_result.success:
-            if cmd_result.stdout:
-                logger.debug(f"Command output: {cmd_result.stdout[:200]}...")
-        else:
-            logger.error(f"Command failed (exit={cmd_result.returncode}): {cmd_str}")
-            if cmd_result.stderr:
-                logger.error(f"Error output: {cmd_result.stderr}")
-        
-        # Raise exception if check is True and command failed
-        if check and not cmd_result.success:
-            raise subprocess.CalledProcessError(
-                cmd_result.returncode,
-                cmd_list,
-                cmd_result.stdout,
-                cmd_result.stderr,
+        if capture_output and not binary and (on_stdout_line is not None or max_capture_bytes is not None):
+            returncode, stdout, stderr = _run_streamed(
+                cmd_list, kwargs, on_stdout_line, max_capture_bytes,
             )
+        else:
+            result = subprocess.run(cmd_list, **kwargs)
+            returncode, stdout, stderr = result.returncode, result.stdout, result.stderr
         
-        return cmd_result
+        return _command_result(cmd_list, cmd, returncode, stdout, stderr, capture_output, check, binary)
         
-    except subprocess.TimeoutExpired as e:
-        logger.error(f"Command timed out after {timeout}s: {cmd_str}")
+    except subprocess.TimeoutExpired:
+        logger.error("Command timed out after %ss: %s", timeout, _cmd_text(cmd))
         raise
         
-    except FileNotFoundError as e:
-        logger.error(f"Command not found: {cmd_str}")
+    except FileNotFoundError:
+        logger.error("Command not found: %s", _cmd_text(cmd))
         raise
         
     except Exception as e:
-        logger.error(f"Command execution failed: {e}")
+        logger.error("Command execution failed: %s", e)
         raise
 
 
+async def run_command_async(
+    cmd: Union[str, List[str]],
+    check: bool = True,
+    cwd: Optional[Path] = None,
+    env: Optional[Mapping[str, str]] = None,
+    timeout: Optional[int] = 300,
+    capture_output: bool = True,
+) -> CommandResult:
+    """asyncio counterpart of run_command(), same arguments and result"""
+    cmd_list = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Executing: %s", _cmd_text(cmd))
+    
+    stream = subprocess.PIPE if capture_output else subprocess.DEVNULL
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd_list,
+            cwd=os.fspath(cwd) if cwd is not None else None,
+            env=env,
+            stdout=stream,
+            stderr=stream,
+            close_fds=False,
+        )
+    except FileNotFoundError:
+        logger.error("Command not found: %s", _cmd_text(cmd))
+        raise
+    
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.error("Command timed out after %ss: %s", timeout, _cmd_text(cmd))
+        raise subprocess.TimeoutExpired(cmd_list, timeout)
+    
+    return _command_result(
+        cmd_list, cmd, proc.returncode,
+        stdout.decode(errors='replace') if capture_output else None,
+        stderr.decode(errors='replace') if capture_output else None,
+        capture_output, check,
+    )
+
+
+def run_commands_parallel(
+    cmds: List[Union[str, List[str]]],
+    max_workers: int = 8,
+    check: bool = True,
+    **kwargs,
+) -> List[CommandResult]:
+    """Run independent commands concurrently; results are in input order
+    
+    At most max_workers children run at once. Every command runs to
+    completion; with check=True the first failure (in input order) is
+    raised afterwards.
+    """
+    async def _gather():
+        slots = asyncio.Semaphore(max_workers)
+        
+        async def _one(cmd):
+            async with slots:
+                return await run_command_async(cmd, check=check, **kwargs)
+        
+        return await asyncio.gather(*(_one(cmd) for cmd in cmds), return_exceptions=True)
+    
+    results = asyncio.run(_gather())
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+class _TailBuffer:
+    """Collects output lines, dropping the oldest beyond `limit` bytes (UTF-8)"""
+    
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.lines = deque()
+        self.sizes = deque()
+        self.size = 0
+    
+    def append(self, line: str):
+        self.lines.append(line)
+        if self.limit is None:
+            return
+        size = len(line.encode('utf-8', 'surrogateescape')) + 1
+        self.sizes.append(size)
+        self.size += size
+        while self.size > self.limit and len(self.lines) > 1:
+            self.lines.popleft()
+            self.size -= self.sizes.popleft()
+    
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+
+def _pump(pipe, buffer: _TailBuffer, callback: Optional[Callable[[str], None]]):
+    """Drain a pipe line by line into buffer (and callback), then close it"""
+    with pipe:
+        for line in pipe:
+            line = line.rstrip('\n')
+            if callback is not None:
+                try:
+                    callback(line)
+                except Exception as e:
+                    # Keep draining, a stalled pipe would block the child
+                    logger.debug("Output callback failed, disabling it: %s", e)
+                    callback = None
+            buffer.append(line)
+
+
+def _run_streamed(
+    cmd_list: List[str],
+    kwargs: dict,
+    on_stdout_line: Optional[Callable[[str], None]],
+    max_capture_bytes: Optional[int],
+) -> Tuple[int, str, str]:
+    """Popen with a reader thread per pipe; returns (returncode, stdout, stderr)"""
+    popen_kwargs = {k: v for k, v in kwargs.items() if k != 'timeout'}
+    out = _TailBuffer(max_capture_bytes)
+    err = _TailBuffer(max_capture_bytes)
+    
+    # No `with Popen`: its exit closes the pipes, which blocks while a reader
+    # is still waiting for EOF from a grandchild that inherited them
+    proc = subprocess.Popen(cmd_list, bufsize=1, **popen_kwargs)
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, out, on_stdout_line), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, err, None), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    
+    timeout = kwargs.get('timeout')
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        proc.wait(timeout=timeout)
+        
+        # A grandchild that inherited the pipes can hold them open after the
+        # child exits; the timeout covers that wait too
+        for reader in readers:
+            reader.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if reader.is_alive():
+                raise subprocess.TimeoutExpired(cmd_list, timeout)
+    except BaseException:
+        # Like subprocess.run(): kill the child only. The readers are left
+        # detached and close their pipes once any grandchild lets go.
+        proc.kill()
+        proc.wait()
+        raise
+    
+    return proc.returncode, out.text(), err.text()
+
+
+def run_command_fast(argv: List[str]) -> int:
+    """Run argv with output discarded and return only its exit status
+    
+    posix_spawnp() + waitpid() without the Popen machinery or a
+    CommandResult, for quick status probes. No timeout, so only use it
+    for commands that can't hang.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Executing: %s", shlex.join(argv))
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        pid = os.posix_spawnp(argv[0], argv, os.environ, file_actions=[
+            (os.POSIX_SPAWN_DUP2, devnull, 1),
+            (os.POSIX_SPAWN_DUP2, devnull, 2),
+        ])
+    finally:
+        os.close(devnull)
+    
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
 def command_exists(cmd: str) -> bool:
     """Check if command exists in PATH"""
-    try:
-        result = run_command(f"command -v {cmd}", check=False, capture_output=False)
-        return result.success
-    except Exception:
-        return False
+    return _which(cmd) is not None
+
+
+# Call after installing software; covers changes inotify can't see (or no inotify)
+command_exists.cache_clear = _WHICH_CACHE.clear
+
+
+# Package lists fetched less than this many seconds ago are reused
+APT_UPDATE_TTL = 300
+_apt_updated_at: Optional[float] = None
+
+
+def _apt_update():
+    """Run apt-get update unless it already ran within APT_UPDATE_TTL"""
+    global _apt_updated_at
+    
+    if _apt_updated_at is not None and time.monotonic() - _apt_updated_at < APT_UPDATE_TTL:
+        logger.debug("Package lists are fresh, skipping apt-get update")
+        return
+    
+    logger.info("Updating package lists...")
+    run_command(['apt-get', 'update'], max_capture_bytes=MAX_CAPTURE_BYTES)
+    _apt_updated_at = time.monotonic()
 
 
 def apt_install(packages: List[str], update: bool = True) -> bool:
     """Install packages using apt"""
     try:
         if update:
-            logger.info("Updating package lists...")
-            run_command("apt-get update")
+            _apt_update()
         
-        logger.info(f"Installing packages: {', '.join(packages)}")
-        run_command(f"apt-get install -y {' '.join(packages)}")
+        logger.info("Installing packages: %s", ', '.join(packages))
+        run_command(['apt-get', 'install', '-y', *packages], max_capture_bytes=MAX_CAPTURE_BYTES)
+        command_exists.cache_clear()
         return True
         
     except Exception as e:
-        logger.error(f"Failed to install packages: {e}")
+        logger.error("Failed to install packages: %s", e)
         return False
 
 
+_SYSTEMCTL_ACTIONS = ['start', 'stop', 'restart', 'enable', 'disable', 'status']
+_VALID_SYSTEMCTL_ACTIONS = frozenset(_SYSTEMCTL_ACTIONS)
+_INVALID_ACTION_MSG = f"Invalid action. Must be one of: {_SYSTEMCTL_ACTIONS}"
+
+
+def _check_systemctl_action(action: str):
+    if action not in _VALID_SYSTEMCTL_ACTIONS:
+        raise ValueError(_INVALID_ACTION_MSG)
+
+
+# `systemctl is-enabled` states that exit 0
+_ENABLED_STATES = frozenset({
+    'enabled', 'enabled-runtime', 'alias', 'static', 'indirect', 'generated', 'transient',
+})
+_ENABLED_STATES_BYTES = frozenset(state.encode() for state in _ENABLED_STATES)
+
+
+# Units still settling after a start/stop job was queued
+_TRANSITIONAL_STATES = frozenset({'activating', 'deactivating', 'reloading'})
+
+# Seconds to wait for start/stop jobs (or started units to leave a transitional state)
+SYSTEMD_JOB_TIMEOUT = 90
+
+# D-Bus messages dispatched per wakeup while waiting for job signals
+_DBUS_DISPATCH_BATCH = 16
+
+_UNIT_SUFFIXES = (
+    '.service', '.socket', '.target', '.timer', '.mount', '.automount',
+    '.path', '.slice', '.scope', '.device', '.swap',
+)
+
+
+def _unit_name(service: str) -> str:
+    """Expand a bare service name the way systemctl does"""
+    return service if service.endswith(_UNIT_SUFFIXES) else f"{service}.service"
+
+
+class _SystemdDbus:
+    """One D-Bus connection to systemd's Manager, shared by all systemctl calls
+    
+    Needs the optional pystemd package; get() returns None when it or the
+    system bus is unavailable, and callers shell out to systemctl instead.
+    """
+    
+    _instance = None
+    _unavailable = False
+    
+    def __init__(self):
+        from pystemd.dbuslib import DBus
+        from pystemd.systemd1 import Manager
+        
+        self._bus = DBus()
+        self._bus.open()
+        self._manager = Manager(bus=self._bus, _autoload=True).Manager
+        
+        # Job object paths we wait on, and those systemd reported as done
+        self._awaited_jobs = set()
+        self._finished_jobs = set()
+        try:
+            self._manager.Subscribe()
+            self._bus.match_signal(
+                b'org.freedesktop.systemd1',
+                b'/org/freedesktop/systemd1',
+                b'org.freedesktop.systemd1.Manager',
+                b'JobRemoved',
+                self._on_job_removed,
+                None,
+            )
+            self._job_signals = True
+        except Exception as e:
+            logger.debug("No JobRemoved signals, polling unit state instead: %s", e)
+            self._job_signals = False
+    
+    @classmethod
+    def get(cls) -> Optional['_SystemdDbus']:
+        """Return the shared connection, or None if D-Bus can't be used"""
+        if cls._instance is None and not cls._unavailable:
+            try:
+                cls._instance = cls()
+            except ImportError:
+                cls._unavailable = True
+            except Exception as e:
+                logger.debug("systemd D-Bus connection failed, using systemctl: %s", e)
+                cls._unavailable = True
+        return cls._instance
+    
+    def active_states(self, units: List[str]) -> Dict[str, str]:
+        """ActiveState of each unit in one ListUnitsByNames call"""
+        rows = self._manager.ListUnitsByNames([u.encode() for u in units])
+        return {row[0].decode(): row[3].decode() for row in rows}
+    
+    def _on_job_removed(self, msg, error=None, userdata=None):
+        msg.process_reply(True)
+        job = msg.body[1]
+        if job in self._awaited_jobs:
+            self._finished_jobs.add(job)
+    
+    def _wait_jobs(self, jobs: set, timeout: float) -> bool:
+        """Block until systemd reports every job removed; False on timeout"""
+        deadline = time.monotonic() + timeout
+        try:
+            with selectors.DefaultSelector() as sel:
+                sel.register(self._bus.get_fd(), selectors.EVENT_READ)
+                while True:
+                    # process() dispatches one queued message, no-op when idle
+                    for _ in range(_DBUS_DISPATCH_BATCH):
+                        self._bus.process()
+                    if jobs <= self._finished_jobs:
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    # Short slices: sd-bus may already have read messages
+                    # beyond the batch, which leave the fd idle
+                    sel.select(min(remaining, 0.1))
+        finally:
+            self._awaited_jobs -= jobs
+            self._finished_jobs -= jobs
+    
+    def reload(self):
+        self._manager.Reload()
+    
+    def unit_file_state(self, unit: str) -> str:
+        return self._manager.GetUnitFileState(unit.encode()).decode()
+    
+    def _settled_states(self, units: List[str]) -> Dict[str, str]:
+        """Poll active states until no unit is mid start/stop (or timeout)"""
+        deadline = time.monotonic() + SYSTEMD_JOB_TIMEOUT
+        states = self.active_states(units)
+        while (not _TRANSITIONAL_STATES.isdisjoint(states.values())
+               and time.monotonic() < deadline):
+            time.sleep(0.1)
+            states = self.active_states(units)
+        return states
+    
+    def control(self, services: List[str], action: str) -> Dict[str, bool]:
+        """Apply a systemctl action to services; same result meaning as systemctl()"""
+        units = [_unit_name(svc) for svc in services]
+        encoded = [u.encode() for u in units]
+        
+        if action in ('start', 'stop', 'restart'):
+            method = {
+                'start': self._manager.StartUnit,
+                'stop': self._manager.StopUnit,
+                'restart': self._manager.RestartUnit,
+            }[action]
+            jobs = {method(unit, b'replace') for unit in encoded}
+            self._awaited_jobs |= jobs
+        elif action == 'enable':
+            self._manager.EnableUnitFiles(encoded, False, False)
+            self.reload()
+        elif action == 'disable':
+            self._manager.DisableUnitFiles(encoded, False)
+            self.reload()
+        
+        # Like systemctl, wait for start/stop/restart jobs to finish
+        if action in ('start', 'stop', 'restart') and self._job_signals:
+            if not self._wait_jobs(jobs, SYSTEMD_JOB_TIMEOUT):
+                logger.warning("Timed out waiting for systemd to %s %s", action, ', '.join(units))
+        
+        # Verify services are in the desired state
+        if action in ('start', 'enable', 'status'):
+            poll = action == 'start' and not self._job_signals
+            states = self._settled_states(units) if poll else self.active_states(units)
+            return {svc: states.get(unit) == 'active' for svc, unit in zip(services, units)}
+        elif action == 'disable':
+            return {
+                svc: self.unit_file_state(unit) not in _ENABLED_STATES
+                for svc, unit in zip(services, units)
+            }
+        
+        return dict.fromkeys(services, True)
+
+
 def systemctl(service: str, action: str) -> bool:
     """Control systemd service"""
-    valid_actions = ['start', 'stop', 'restart', 'enable', 'disable', 'status']
-    
-    if action not in valid_actions:
-        raise ValueError(f"Invalid action. Must be one of: {valid_actions}")
+    _check_systemctl_action(action)
     
     try:
-        result = run_command(f"systemctl {action} {service}", check=False)
+        bus = _SystemdDbus.get()
+        if bus is not None:
+            try:
+                return bus.control([service], action)[service]
+            except Exception as e:
+                logger.debug("D-Bus %s of %s failed, using systemctl: %s", action, service, e)
+        
+        result = run_command(['systemctl', action, service], check=False)
         
         if action == 'status':
             return result.success
         else:
             # Verify service is in desired state
             if action in ['start', 'enable']:
-                result = run_command(f"systemctl is-active {service}", check=False)
-                return result.success
+                return run_command_fast(['systemctl', 'is-active', service]) == 0
             elif action == 'disable':
-                result = run_command(f"systemctl is-enabled {service}", check=False)
-                return not result.success  # Should be disabled
+                return run_command_fast(['systemctl', 'is-enabled', service]) != 0  # Should be disabled
             
         return True
         
     except Exception as e:
-        logger.error(f"Failed to {action} service {service}: {e}")
+        logger.error("Failed to %s service %s: %s", action, service, e)
         return False
 
 
-def create_service_file(name: str, content: str) -> bool:
-    """Create systemd service file"""
+def _unit_props(services: List[str]) -> Dict[str, Dict[bytes, bytes]]:
+    """ActiveState/UnitFileState of each service from one `systemctl show`
+    
+    Keyed by unit name rather than output position; a service systemctl said
+    nothing about gets an empty dict.
+    """
+    result = run_command(
+        ['systemctl', 'show', '-p', 'Names,ActiveState,UnitFileState', '--', *services],
+        check=False, binary=True,
+    )
+    by_name = {}
+    for block in result.stdout.split(b'\n\n'):
+        props = dict(line.partition(b'=')[::2] for line in block.splitlines() if line)
+        for name in props.get(b'Names', b'').split():
+            by_name[name.decode()] = props
+    return {svc: by_name.get(_unit_name(svc), {}) for svc in services}
+
+
+def unit_active_states(services: List[str]) -> Dict[str, str]:
+    """ActiveState of each service in one query, over D-Bus when available ('' if unknown)"""
+    bus = _SystemdDbus.get()
+    if bus is not None:
+        try:
+            states = bus.active_states([_unit_name(svc) for svc in services])
+            return {svc: states.get(_unit_name(svc), '') for svc in services}
+        except Exception as e:
+            logger.debug("D-Bus unit query failed, using systemctl: %s", e)
+    
+    props = _unit_props(services)
+    return {svc: props[svc].get(b'ActiveState', b'').decode() for svc in services}
+
+
+def systemctl_many(services: List[str], action: str) -> Dict[str, bool]:
+    """Control several systemd services with one systemctl call per step
+    
+    Returns a per-service result with the same meaning as systemctl().
+    """
+    _check_systemctl_action(action)
+    
+    if not services:
+        return {}
+    
+    try:
+        bus = _SystemdDbus.get()
+        if bus is not None:
+            try:
+                return bus.control(services, action)
+            except Exception as e:
+                logger.debug("D-Bus %s of %s failed, using systemctl: %s",
+                             action, ', '.join(services), e)
+        
+        if action != 'status':
+            run_command(['systemctl', action, *services], check=False)
+        
+        # Verify services are in the desired state
+        if action in ['start', 'enable', 'status']:
+            props = _unit_props(services)
+            return {svc: props[svc].get(b'ActiveState') == b'active' for svc in services}
+        elif action == 'disable':
+            props = _unit_props(services)
+            # No UnitFileState at all means systemctl didn't report on it: not verified
+            return {
+                svc: props[svc].get(b'UnitFileState', b'enabled') not in _ENABLED_STATES_BYTES
+                for svc in services
+            }
+        
+        return dict.fromkeys(services, True)
+        
+    except Exception as e:
+        logger.error("Failed to %s services %s: %s", action, ', '.join(services), e)
+        return dict.fromkeys(services, False)
+
+
+# Set when a unit file changed but daemon-reload was deferred
+_needs_reload = False
+
+# systemd_batch() nesting depth; only the outermost batch reloads
+_batch_depth = 0
+
+
+def _daemon_reload():
+    """Have systemd re-read unit files, over D-Bus when available"""
+    bus = _SystemdDbus.get()
+    if bus is not None:
+        try:
+            bus.reload()
+            return
+        except Exception as e:
+            logger.debug("D-Bus daemon-reload failed, using systemctl: %s", e)
+    run_command(['systemctl', 'daemon-reload'])
+
+
+def flush_systemd_reloads():
+    """Run the daemon-reload deferred by create_service_file(..., reload=False)"""
+    global _needs_reload
+    
+    if _needs_reload:
+        _needs_reload = False
+        _daemon_reload()
+
+
+@contextmanager
+def systemd_batch():
+    """Defer create_service_file() reloads to one daemon-reload on exit
+    
+    Nests; only the outermost batch reloads. If the body raises, the
+    reload stays pending for the next flush_systemd_reloads().
+    """
+    global _batch_depth
+    
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+    
+    if _batch_depth == 0:
+        flush_systemd_reloads()
+
+
+def create_service_file(name: str, content: str, backup: bool = True, reload: bool = True) -> bool:
+    """Create systemd service file
+    
+    Identical content is left alone (no write, no daemon-reload). With
+    reload=False, or inside systemd_batch(), the daemon-reload is deferred.
+    """
+    global _needs_reload
+    
     service_path = Path(f"/etc/systemd/system/{name}.service")
+    data = content.encode()
     
     try:
-        # Backup existing file
-        if service_path.exists():
+        try:
+            if service_path.read_bytes() == data:
+                logger.debug("Service file %s unchanged", service_path)
+                return True
+            exists = True
+        except FileNotFoundError:
+            exists = False
+        
+        # Backup existing file; a hard link keeps it in place until the replace
+        if exists and backup:
             backup_path = service_path.with_suffix('.service.backup')
-            service_path.rename(backup_path)
-            logger.debug(f"Backed up existing service file to {backup_path}")
+            backup_path.unlink(missing_ok=True)
+            os.link(service_path, backup_path)
+            logger.debug("Backed up existing service file to %s", backup_path)
         
-        # Write new service file
+        # Write new service file atomically
         service_path.parent.mkdir(parents=True, exist_ok=True)
-        service_path.write_text(content)
-        logger.info(f"Created service file: {service_path}")
+        new_path = service_path.with_suffix('.service.new')
+        new_path.write_bytes(data)
+        os.replace(new_path, service_path)
+        logger.info("Created service file: %s", service_path)
         
         # Reload systemd
-        run_command("systemctl daemon-reload")
+        if reload and not _batch_depth:
+            _daemon_reload()
+        else:
+            _needs_reload = True
         
         return True
         
     except Exception as e:
-        logger.error(f"Failed to create service file {name}: {e}")
-        return False
\ No newline at end of file
+        logger.error("Failed to create service file %s: %s", name, e)
+        return False